@@ -5,12 +5,15 @@ Processes programming language datasets from HuggingFace "the-stack-smol" datase
 with quality-based filtering and weighted scoring for professional reference data
 """
 from datasets import load_dataset, Dataset
+import numpy as np
 import pandas as pd
 import os
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 import statistics
 
+from score_quality import score_quality
+
 # Configuration - 30 programming languages in the-stack-smol
 LANGUAGES = [
     "assembly",
@@ -72,6 +75,9 @@ def calculate_quality_score(sample: Dict[str, Any]) -> float:
     """
     Calculate a quality score (0-1) based on code metrics
     Higher scores indicate better code quality for ZenGlow
+
+    Scalar reference implementation for single samples; batch filtering in
+    filter_by_quality() scores through the shared score_quality() kernel.
     """
     score = 0.0
     factors = 0
@@ -135,6 +141,45 @@ def calculate_quality_score(sample: Dict[str, Any]) -> float:
     return score / factors if factors > 0 else 0.5
 
 
+def _batch_quality_scores(samples: List[Dict[str, Any]]) -> "np.ndarray":
+    """Score samples with one score_quality() call over feature arrays.
+
+    Mirrors calculate_quality_score's missing-field handling: each factor
+    only counts toward a sample's average when the sample carries it.
+    """
+    n = len(samples)
+    alphanum = np.zeros(n)
+    avg_len = np.zeros(n)
+    size = np.zeros(n)
+    license_ok = np.zeros(n, dtype=bool)
+    present = np.zeros((4, n), dtype=bool)
+    for idx, sample in enumerate(samples):
+        v = sample.get("alphanum_fraction")
+        if v is not None:
+            alphanum[idx] = float(v)
+            present[0, idx] = True
+        v = sample.get("avg_line_length")
+        if v is not None:
+            avg_len[idx] = float(v)
+            present[1, idx] = True
+        v = sample.get("size")
+        if v is not None:
+            size[idx] = int(v)
+            present[2, idx] = True
+        licenses = sample.get("licenses")
+        if licenses:
+            present[3, idx] = True
+            if not isinstance(licenses, list):
+                licenses = [licenses]
+            license_ok[idx] = any(
+                lic in QUALITY_THRESHOLDS["preferred_licenses"] for lic in licenses if lic
+            )
+    a_s, l_s, s_s, lic_s, _ = score_quality(alphanum, avg_len, size, license_ok)
+    totals = (np.stack((a_s, l_s, s_s, lic_s)) * present).sum(axis=0)
+    factors = present.sum(axis=0)
+    return np.where(factors > 0, totals / np.maximum(factors, 1), 0.5)
+
+
 def filter_by_quality(
     dataset, min_quality_score: float = 0.6, apply_thresholds: bool = True
 ) -> tuple:
@@ -145,8 +190,7 @@ def filter_by_quality(
         return dataset, {"total": 0, "filtered": 0, "quality_stats": {}}
 
     original_count = len(dataset)
-    indices_to_keep = []
-    quality_scores = []
+    candidates = []  # (index, sample) pairs surviving the hard thresholds
 
     for i in range(len(dataset)):
         sample = dataset[i]
@@ -188,12 +232,18 @@ def filter_by_quality(
                 ):
                     continue
 
-        # Calculate quality score
-        quality_score = calculate_quality_score(sample)
+        candidates.append((i, sample))
 
-        if quality_score >= min_quality_score:
-            indices_to_keep.append(i)
-            quality_scores.append(quality_score)
+    # Score all surviving samples through the shared vectorized kernel
+    # instead of the scalar per-sample loop
+    indices_to_keep = []
+    quality_scores = []
+    if candidates:
+        batch_scores = _batch_quality_scores([s for _, s in candidates])
+        for (i, _), quality_score in zip(candidates, batch_scores):
+            if quality_score >= min_quality_score:
+                indices_to_keep.append(i)
+                quality_scores.append(float(quality_score))
 
     # Create filtered dataset
     filtered_dataset = (
@@ -27,6 +27,7 @@ Ratios Report (JSON): counts & percentages per category + augmentation technique
 """
 from __future__ import annotations
 import argparse, json, random, re, os, hashlib
+from collections import Counter
 from pathlib import Path
 from typing import Dict, Any, List, Iterable
 
@@ -45,15 +46,25 @@ def sha(s: str) -> str:
 
 def load_jsonl(path: Path) -> List[Dict[str, Any]]:
   items=[]
+  bad=0
   with path.open('r', encoding='utf-8') as f:
     for line in f:
-      line=line.strip()
-      if not line:
+      # Cheap prefix check keeps the happy path out of the exception
+      # machinery; blank lines are skipped silently, anything else odd
+      # counts as malformed. lstrip first so indented records still load.
+      line = line.lstrip()
+      if line[:1] != '{':
+        if line:
+          bad += 1
         continue
       try:
         items.append(json.loads(line))
-      except Exception:
-        continue
+      except json.JSONDecodeError as e:
+        bad += 1
+        if bad <= 3:
+          print(f"[load_jsonl] warn: malformed line in {path}: {e}")
+  if bad:
+    print(f"[load_jsonl] skipped {bad} malformed lines in {path}")
   return items
 
 def simple_paraphrase(text: str, rng: random.Random) -> str:
@@ -94,28 +105,50 @@ def inject_distractor(answer: str) -> str:
 def error_then_fix(answer: str) -> str:
   return "Incorrect thought: (confuses terms). Correction: " + answer
 
+def _t_paraphrase(instr, answer, reasoning, rng):
+  return simple_paraphrase(instr, rng), answer, reasoning
+
+def _t_shorten(instr, answer, reasoning, rng):
+  return instr, shorten(answer), reasoning
+
+def _t_expand(instr, answer, reasoning, rng):
+  return instr, expand(answer), reasoning
+
+def _t_cot(instr, answer, reasoning, rng):
+  return instr, answer, add_cot(reasoning, answer)[0]
+
+def _t_query_rewrite(instr, answer, reasoning, rng):
+  return query_rewrite(instr, rng), answer, reasoning
+
+def _t_distractor(instr, answer, reasoning, rng):
+  return instr, inject_distractor(answer), reasoning
+
+def _t_error_fix(instr, answer, reasoning, rng):
+  return instr, error_then_fix(answer), reasoning
+
+# Hoisted so variant_records does not rebuild seven closures per base record.
+_TECHNIQUES = (
+  ('paraphrase_simple', _t_paraphrase),
+  ('shorten_answer', _t_shorten),
+  ('expand_answer', _t_expand),
+  ('cot_expand', _t_cot),
+  ('query_rewrite', _t_query_rewrite),
+  ('distractor_injection', _t_distractor),
+  ('error_then_fix', _t_error_fix),
+)
+
 def variant_records(base: Dict[str, Any], rng: random.Random) -> Iterable[Dict[str, Any]]:
   instr = base.get('instruction') or base.get('query') or ''
   answer = base.get('output') or base.get('expected_answer') or ''
   reasoning = base.get('reasoning')
   base_id = base.get('id')
-  source_type = 'rag' if base.get('type')=='rag_usage' else 'hybrid'
-
-  # Techniques sequence decisions
-  techniques = [
-    ('paraphrase_simple', lambda: (simple_paraphrase(instr, rng), answer, reasoning)),
-    ('shorten_answer', lambda: (instr, shorten(answer), reasoning)),
-    ('expand_answer', lambda: (instr, expand(answer), reasoning)),
-    ('cot_expand', lambda: (instr, answer, add_cot(reasoning, answer)[0])),
-    ('query_rewrite', lambda: (query_rewrite(instr, rng), answer, reasoning)),
-    ('distractor_injection', lambda: (instr, inject_distractor(answer), reasoning)),
-    ('error_then_fix', lambda: (instr, error_then_fix(answer), reasoning)),
-  ]
+  source_type = base.get('source_type') or ('rag' if base.get('type')=='rag_usage' else 'hybrid')
+
   # Sample subset for diversity
-  chosen = rng.sample(techniques, k=min(3, len(techniques)))
-  for tech, fn in chosen:
+  for idx in rng.sample(range(len(_TECHNIQUES)), k=min(3, len(_TECHNIQUES))):
+    tech, fn = _TECHNIQUES[idx]
     try:
-      new_instr, new_answer, new_reasoning = fn()
+      new_instr, new_answer, new_reasoning = fn(instr, answer, reasoning, rng)
     except Exception:
       continue
     yield {
@@ -128,7 +161,7 @@ def variant_records(base: Dict[str, Any], rng: random.Random) -> Iterable[Dict[s
       'source_type': source_type,
       'scenario': base.get('scenario'),
       'metadata': {
-        'origin_type': base.get('example_type') or base.get('type'),
+        'origin_type': (base.get('metadata') or {}).get('origin_type') or base.get('example_type') or base.get('type'),
       }
     }
 
@@ -136,43 +169,35 @@ def build(args):
   RNG.seed(args.seed)
   hybrid = load_jsonl(Path(args.hybrid)) if args.hybrid and Path(args.hybrid).exists() else []
   rag = load_jsonl(Path(args.rag)) if args.rag and Path(args.rag).exists() else []
-  base_records: List[Dict[str, Any]] = []
-  # Normalize base into unified format
+  # Normalize straight into the unified supervised shape; no second
+  # base->all_records remap pass (and no duplicate dict allocations).
+  all_records: List[Dict[str, Any]] = []
   for h in hybrid:
-    base_records.append({
+    all_records.append({
       'id': h['id'],
       'instruction': h['instruction'],
       'output': h['output'],
+      'reasoning': None,
       'source_type': 'hybrid',
-      'example_type': h.get('example_type'),
+      'scenario': None,
+      'metadata': { 'origin_type': h.get('example_type') },
     })
   for r in rag:
-    base_records.append({
+    all_records.append({
       'id': r['id'],
       'instruction': r.get('prompt') or r.get('query'),
       'output': r.get('response') or r.get('expected_answer'),
+      'reasoning': r.get('reasoning'),
       'source_type': 'rag',
-      'type': r.get('type'),
       'scenario': r.get('scenario'),
-      'reasoning': r.get('reasoning'),
+      'metadata': { 'origin_type': r.get('type') },
     })
+  base_total = len(all_records)
+  source_counts = Counter(b['source_type'] for b in all_records)
   variants: List[Dict[str, Any]] = []
-  for b in base_records:
+  for b in all_records:
     for v in variant_records(b, RNG):
       variants.append(v)
-  # Assemble final list
-  all_records = []
-  # Repackage base minimal structure into unified supervised form
-  for b in base_records:
-    all_records.append({
-      'id': b['id'],
-      'instruction': b['instruction'],
-      'output': b['output'],
-      'reasoning': b.get('reasoning'),
-      'source_type': b['source_type'],
-      'scenario': b.get('scenario'),
-      'metadata': { 'origin_type': b.get('example_type') or b.get('type') }
-    })
   all_records.extend(variants)
   RNG.shuffle(all_records)
 
@@ -183,19 +208,17 @@ def build(args):
 
   # Ratios / stats
   total = len(all_records)
-  base_total = len(base_records)
   variant_total = len(variants)
-  augment_counts = {}
-  for v in variants:
-    augment_counts[v['augmentation']] = augment_counts.get(v['augmentation'], 0) + 1
+  # Counter iterates in C; cheaper than per-item dict.get bookkeeping.
+  augment_counts = dict(Counter(v['augmentation'] for v in variants))
   ratios = {
     'total_examples': total,
     'base_examples': base_total,
     'variant_examples': variant_total,
     'variant_fraction': round(variant_total/total, 4) if total else 0,
     'source_breakdown': {
-      'hybrid_base': sum(1 for b in base_records if b['source_type']=='hybrid'),
-      'rag_base': sum(1 for b in base_records if b['source_type']=='rag'),
+      'hybrid_base': source_counts.get('hybrid', 0),
+      'rag_base': source_counts.get('rag', 0),
     },
     'augmentation_distribution': augment_counts,
   }
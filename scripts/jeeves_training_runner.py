@@ -20,9 +20,15 @@ Notes:
 """
 from __future__ import annotations
 
-import argparse, os, subprocess, hashlib, json, sys, tarfile, io, time, glob
+import argparse, os, subprocess, hashlib, json, sys, tarfile, io, time, glob, gzip, mmap
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:  # optional; tree-parallel hashing for large artifacts
+    import blake3  # type: ignore
+except Exception:  # noqa: BLE001
+    blake3 = None
+
 ROOT = Path(__file__).resolve().parents[2]
 
 
@@ -34,6 +40,31 @@ def sha256_file(p: Path) -> str:
     return h.hexdigest()
 
 
+def _hash_fileobj(fh, size: int) -> tuple[str, str]:
+    if blake3 is not None and size:
+        try:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return 'blake3', blake3.blake3(mm, max_threads=blake3.blake3.AUTO).hexdigest()
+        except Exception:  # noqa: BLE001
+            pass
+    h = hashlib.sha256()
+    fh.seek(0)
+    for chunk in iter(lambda: fh.read(65536), b''):
+        h.update(chunk)
+    return 'sha256', h.hexdigest()
+
+
+def hash_file(p: Path) -> tuple[str, str]:
+    """Return (algo, hexdigest) for an artifact file.
+
+    Prefers multi-threaded blake3 over a memory-mapped view (tree hashing
+    parallelizes across cores, several times faster than SHA-256 on large
+    artifacts); falls back to streaming SHA-256 when blake3 is unavailable.
+    """
+    with p.open('rb') as f:
+        return _hash_fileobj(f, os.fstat(f.fileno()).st_size)
+
+
 def run(cmd: list[str]):
     print(f"[run] {' '.join(cmd)}")
     result = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
@@ -72,6 +103,43 @@ def build_rag_usage(out_path: Path, total: int):
     ])
 
 
+_BATCH_META_KEYS = {'count', 'embedding_dim', 'source', 'batch_tag', 'created_at', 'version'}
+
+
+def _read_batch_meta(fh) -> dict:
+    """Stream just the top-level metadata keys from a batch msgpack map.
+
+    Walks the map entry by entry and stops once every wanted key has been
+    seen, skipping the (potentially huge) records array instead of decoding
+    it. Metadata scans stay O(header) rather than O(filesize).
+    """
+    import msgpack  # type: ignore
+    unpacker = msgpack.Unpacker(fh, raw=False)
+    n_keys = unpacker.read_map_header()
+    obj: dict = {}
+    for _ in range(n_keys):
+        key = unpacker.unpack()
+        if key == 'records':
+            unpacker.skip()
+            continue
+        obj[key] = unpacker.unpack()
+        if _BATCH_META_KEYS <= obj.keys():
+            break
+    return obj
+
+
+def _batch_reader(fh, path: str):
+    """Plain file object, or a zstd stream reader for .zst artifacts.
+
+    rag_ingest writes .msgpack.zst when zstandard is installed; metadata
+    parsing streams through the decompressor without inflating the file.
+    """
+    if path.endswith('.zst'):
+        import zstandard  # type: ignore
+        return zstandard.ZstdDecompressor().stream_reader(fh)
+    return fh
+
+
 def load_rag_batches(glob_pattern: str) -> list[dict]:
     """Scan for rag batch msgpack artifacts and extract lightweight metadata.
 
@@ -87,15 +155,22 @@ def load_rag_batches(glob_pattern: str) -> list[dict]:
     metas: list[dict] = []
     for f in files:
         try:
+            # One open serves stat, hash and metadata parse so each file is
+            # read (and page-cached) once instead of three times.
             with open(f, 'rb') as fh:
-                unpacker = msgpack.Unpacker(fh, raw=False)
-                obj = unpacker.unpack()
-            # Avoid keeping large records list; pop it if present.
+                size = os.fstat(fh.fileno()).st_size
+                algo, digest = _hash_fileobj(fh, size)
+                fh.seek(0)
+                try:
+                    obj = _read_batch_meta(_batch_reader(fh, f))
+                except Exception:  # noqa: BLE001  # unknown layout -> full decode
+                    fh.seek(0)
+                    obj = msgpack.Unpacker(_batch_reader(fh, f), raw=False).unpack()
             rec_count = obj.get('count') or (len(obj.get('records', [])) if isinstance(obj.get('records'), list) else None)
             meta = {
                 'file': f,
-                'bytes': os.path.getsize(f),
-                'sha256': sha256_file(Path(f)),
+                'bytes': size,
+                algo: digest,
                 'count': rec_count,
                 'embedding_dim': obj.get('embedding_dim'),
                 'source': obj.get('source'),
@@ -113,7 +188,11 @@ def load_rag_batches(glob_pattern: str) -> list[dict]:
 
 def bundle_files(tar_path: Path, file_paths: list[Path], manifest: dict):
     tar_path.parent.mkdir(parents=True, exist_ok=True)
-    with tarfile.open(tar_path, 'w:gz') as tf:
+    # Streaming tar through gzip level 1: artifacts are low-entropy JSONL or
+    # already-packed msgpack, so level 6 buys almost nothing over level 1
+    # while costing several times the CPU.
+    with gzip.open(tar_path, 'wb', compresslevel=1) as gz, \
+            tarfile.open(fileobj=gz, mode='w|') as tf:
         # Add each file
         for p in file_paths:
             if p.exists():
@@ -139,7 +218,7 @@ def main():
     ap.add_argument('--rag-out', default='data/rag/rag_usage_examples.jsonl')
     ap.add_argument('--summary-out', default='artifacts/jeeves_training_summary.json')
     ap.add_argument('--include-rag-batches', action='store_true', help='Scan and include rag ingestion batch msgpack metadata')
-    ap.add_argument('--rag-batch-glob', default='data/msgpack/rag_batch_*.msgpack', help='Glob for rag batch msgpack files')
+    ap.add_argument('--rag-batch-glob', default='data/msgpack/rag_batch_*.msgpack*', help='Glob for rag batch msgpack files (matches .msgpack and .msgpack.zst)')
     ap.add_argument('--bundle-tar', help='Optional output tar.gz consolidating artifacts + manifest')
     ap.add_argument('--audit', action='store_true', help='Run data audit and embed results into summary')
     ap.add_argument('--audit-out', default='artifacts/jeeves_data_audit.json', help='Audit output JSON path')
@@ -150,13 +229,20 @@ def main():
     rag_out = ROOT / args.rag_out
     summary_out = ROOT / args.summary_out
 
-    ensure_hybrid_dataset(dataset_path, args.hybrid_pure, args.hybrid_math)
-    build_hybrid_artifacts(dataset_path, artifacts_dir, args.hybrid_prefix)
-    build_rag_usage(rag_out, args.rag_total)
-
-    rag_batch_meta = []
-    if args.include_rag_batches:
-        rag_batch_meta = load_rag_batches(args.rag_batch_glob)
+    def _build_hybrid():
+        ensure_hybrid_dataset(dataset_path, args.hybrid_pure, args.hybrid_math)
+        build_hybrid_artifacts(dataset_path, artifacts_dir, args.hybrid_prefix)
+
+    # The hybrid branch, rag usage builder and rag batch scan are mutually
+    # independent; each mostly waits on a subprocess, so run them in parallel
+    # and join before the audit/summary steps.
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        fut_hybrid = ex.submit(_build_hybrid)
+        fut_rag = ex.submit(build_rag_usage, rag_out, args.rag_total)
+        fut_batches = ex.submit(load_rag_batches, args.rag_batch_glob) if args.include_rag_batches else None
+        fut_hybrid.result()
+        fut_rag.result()
+        rag_batch_meta = fut_batches.result() if fut_batches else []
 
     audit_payload = None
     if args.audit:
@@ -192,9 +278,10 @@ def main():
     ]
     for fp in files_of_interest:
         if fp.exists():
+            algo, digest = hash_file(fp)
             summary[str(fp.relative_to(ROOT))] = {
                 'bytes': fp.stat().st_size,
-                'sha256': sha256_file(fp)
+                algo: digest
             }
 
     summary_out.parent.mkdir(parents=True, exist_ok=True)
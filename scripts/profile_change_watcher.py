@@ -16,18 +16,44 @@ from __future__ import annotations
 import os, time, json, argparse, hashlib, psycopg2
 from psycopg2.extras import RealDictCursor
 
+PROFILE_SQL = """
+SELECT m.id as member_id, m.full_name, m.role, f.family_key, f.display_name,
+       p.preferences, p.traits, p.updated_at
+FROM family_members m
+JOIN families f ON f.id = m.family_id
+LEFT JOIN member_profiles p ON p.member_id = m.id
+WHERE m.full_name=$1
+LIMIT 1
+"""
+
+# Cheap first-stage filter: member_profiles is the only table with an
+# updated_at column, so only that timestamp can short-circuit the full fetch.
+UPDATED_AT_SQL = """
+SELECT p.updated_at
+FROM family_members m
+LEFT JOIN member_profiles p ON p.member_id = m.id
+WHERE m.full_name=$1
+LIMIT 1
+"""
+
+def connect(dsn: str):
+    """Open a long-lived autocommit connection with the fetches pre-prepared."""
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"PREPARE profile_fetch AS {PROFILE_SQL}")
+        cur.execute(f"PREPARE profile_touch AS {UPDATED_AT_SQL}")
+    return conn
+
+def fetch_updated_at(conn, full_name: str):
+    with conn.cursor() as cur:
+        cur.execute("EXECUTE profile_touch(%s)", (full_name,))
+        row = cur.fetchone()
+    return row[0] if row else None
+
 def fetch_profile(conn, full_name: str):
     with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT m.id as member_id, m.full_name, m.role, f.family_key, f.display_name,
-                   p.preferences, p.traits, p.updated_at
-            FROM family_members m
-            JOIN families f ON f.id = m.family_id
-            LEFT JOIN member_profiles p ON p.member_id = m.id
-            WHERE m.full_name=%s
-            LIMIT 1
-            """, (full_name,))
+        cur.execute("EXECUTE profile_fetch(%s)", (full_name,))
         row = cur.fetchone()
     return row
 
@@ -43,10 +69,21 @@ def publish_redis(redis_url: str, payload: dict):
     except Exception as e:  # noqa: BLE001
         print(f"[redis] publish failed: {e}")
 
+_WEBHOOK_CLIENT = None
+
 def post_webhook(url: str, payload: dict):
+    """POST over a cached keep-alive client so repeat webhooks reuse the
+    TCP/TLS connection instead of handshaking every change event."""
+    global _WEBHOOK_CLIENT
     try:
-        import requests  # type: ignore
-        requests.post(url, json=payload, timeout=5)
+        if _WEBHOOK_CLIENT is None:
+            try:
+                import httpx  # type: ignore
+                _WEBHOOK_CLIENT = httpx.Client(timeout=5)
+            except ImportError:
+                import requests  # type: ignore
+                _WEBHOOK_CLIENT = requests.Session()
+        _WEBHOOK_CLIENT.post(url, json=payload, timeout=5)
     except Exception as e:  # noqa: BLE001
         print(f"[webhook] post failed: {e}")
 
@@ -62,22 +99,38 @@ def main():
     if not args.dsn:
         raise SystemExit('Provide --dsn or set DATABASE_URL')
     prev_hash = None
+    prev_updated_at = None
+    conn = None  # persistent; reconnect lazily on error instead of per poll
     while True:
         try:
-            with psycopg2.connect(args.dsn) as conn:
-                row = fetch_profile(conn, args.full_name)
-            if not row:
-                print(f"[watch] member not found: {args.full_name}")
+            if conn is None:
+                conn = connect(args.dsn)
+            # Steady-state short circuit: skip the full row fetch + hash when
+            # the profile timestamp has not advanced since last poll.
+            ts = fetch_updated_at(conn, args.full_name)
+            if ts is not None and prev_updated_at is not None and ts == prev_updated_at:
+                pass
             else:
-                h = stable_hash(row)
-                if prev_hash and h != prev_hash:
-                    payload = {'event':'profile_change','full_name': args.full_name,'timestamp': time.time(),'row': row}
-                    print(f"[change] detected new profile state hash={h[:12]}")
-                    if args.redis_url: publish_redis(args.redis_url, payload)
-                    if args.webhook: post_webhook(args.webhook, payload)
-                prev_hash = h
+                row = fetch_profile(conn, args.full_name)
+                if not row:
+                    print(f"[watch] member not found: {args.full_name}")
+                else:
+                    h = stable_hash(row)
+                    if prev_hash and h != prev_hash:
+                        payload = {'event':'profile_change','full_name': args.full_name,'timestamp': time.time(),'row': row}
+                        print(f"[change] detected new profile state hash={h[:12]}")
+                        if args.redis_url: publish_redis(args.redis_url, payload)
+                        if args.webhook: post_webhook(args.webhook, payload)
+                    prev_hash = h
+                    prev_updated_at = ts
         except Exception as e:  # noqa: BLE001
             print(f"[error] {e}")
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:  # noqa: BLE001
+                    pass
+                conn = None
         if args.once:
             break
         time.sleep(args.interval)
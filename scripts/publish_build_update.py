@@ -36,15 +36,22 @@ logger = logging.getLogger('publish_build_update')
 def _bool(v: str|None) -> bool:
     return (v or '').lower() in {'1','true','yes','on'}
 
+_R: redis.Redis | None = None
+
 def redis_client() -> redis.Redis:
-    return redis.Redis(
-        host=os.getenv('REDIS_HOST','localhost'),
-        port=int(os.getenv('REDIS_PORT','6379')),
-        db=int(os.getenv('REDIS_DB','0')),
-        password=os.getenv('REDIS_PASSWORD'),
-        ssl=_bool(os.getenv('REDIS_SSL')),
-        socket_timeout=5,
-    )
+    """Memoized client so repeated publish() calls (library use, CI loops)
+    reuse one connection pool instead of constructing a new one each time."""
+    global _R
+    if _R is None:
+        _R = redis.Redis(
+            host=os.getenv('REDIS_HOST','localhost'),
+            port=int(os.getenv('REDIS_PORT','6379')),
+            db=int(os.getenv('REDIS_DB','0')),
+            password=os.getenv('REDIS_PASSWORD'),
+            ssl=_bool(os.getenv('REDIS_SSL')),
+            socket_timeout=5,
+        )
+    return _R
 
 def publish(content: str|dict, channel: str, **extra):
     payload = {
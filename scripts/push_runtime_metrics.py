@@ -12,8 +12,11 @@ Optional:
 This can run via cron/systemd timer every N seconds.
 """
 from __future__ import annotations
-import os, time, json, socket
+import http.client
+import os, time, json, socket, threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from operator import itemgetter
 from typing import List, Dict
 
 try:
@@ -22,6 +25,15 @@ try:
 except ImportError as e:
     raise SystemExit("psycopg2 required") from e
 
+try:  # optional; C-extension JSON for the labels serialization
+    import orjson  # type: ignore
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # pragma: no cover
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj)
+
 DSN = os.getenv('DATABASE_URL') or os.getenv('SUPABASE_DB_URL')
 if not DSN:
     raise SystemExit('DATABASE_URL or SUPABASE_DB_URL required')
@@ -30,51 +42,153 @@ DOCKER_SOCK = os.getenv('DOCKER_SOCK', '/var/run/docker.sock')
 SOURCE_TAG = os.getenv('METRICS_SOURCE_TAG', 'host')
 QUEUE_TABLE = os.getenv('QUEUE_TABLE', 'code_chunk_ingest_queue')
 INCLUDE_QUEUE = os.getenv('INCLUDE_QUEUE', '0') == '1'
+# DOCKER_STATS_STREAM=1: keep one stream=true stats connection per container
+# in a daemon thread and serve collection cycles from the cached last sample.
+# Only useful when this module runs inside a long-lived process (not cron).
+STREAM_STATS = os.getenv('DOCKER_STATS_STREAM', '0') == '1'
 
 # Lightweight docker stats (no docker SDK) using Engine API (GET /containers/json, /containers/{id}/stats?stream=false)
 
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP/1.1 keep-alive connection over the Docker unix socket."""
+
+    def __init__(self, sock_path: str, timeout: float = 5):
+        super().__init__('localhost', timeout=timeout)
+        self._sock_path = sock_path
+
+    def connect(self):
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(self.timeout)
+        s.connect(self._sock_path)
+        self.sock = s
+
+# One keep-alive connection per thread: a collection cycle previously meant
+# ~16 connect/teardown pairs on the daemon socket; now each worker thread
+# reuses its own socket across requests.
+_DOCKER_LOCAL = threading.local()
+
 def _docker_get(path: str) -> dict | list | None:
     if not os.path.exists(DOCKER_SOCK):
         return None
-    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    for _attempt in range(2):  # retry once on a stale keep-alive socket
+        conn = getattr(_DOCKER_LOCAL, 'conn', None)
+        try:
+            if conn is None:
+                conn = _UnixHTTPConnection(DOCKER_SOCK)
+                _DOCKER_LOCAL.conn = conn
+            conn.request('GET', path, headers={'Accept': 'application/json'})
+            resp = conn.getresponse()
+            body = resp.read()
+            if not body.strip():
+                return None
+            try:
+                return json.loads(body)
+            except Exception:
+                return None
+        except Exception:
+            try:
+                conn.close()  # type: ignore[union-attr]
+            except Exception:
+                pass
+            _DOCKER_LOCAL.conn = None
+    return None
+
+# Previous CPU counters per container id: (total_usage, system_cpu_usage).
+_PREV_CPU: Dict[str, tuple] = {}
+
+# Streaming sample pump state (see DOCKER_STATS_STREAM above).
+_LAST_SAMPLE: Dict[str, dict] = {}
+_STREAMERS: Dict[str, threading.Thread] = {}
+
+def _stream_container(cid: str):
+    """Hold a stream=true stats connection and keep only the newest sample.
+
+    dockerd pushes one line-delimited JSON document per second, so readers of
+    _LAST_SAMPLE never block on a sample window. Exits on any error; the next
+    collection cycle respawns the pump if the container is still running.
+    """
     try:
-        s.settimeout(2)
-        s.connect(DOCKER_SOCK)
-        req = f"GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: application/json\r\nConnection: close\r\n\r\n"
-        s.sendall(req.encode())
-        data = b''
+        conn = _UnixHTTPConnection(DOCKER_SOCK, timeout=60)
+        conn.request('GET', f'/containers/{cid}/stats?stream=true', headers={'Accept': 'application/json'})
+        resp = conn.getresponse()
         while True:
-            chunk = s.recv(8192)
-            if not chunk:
+            line = resp.readline()
+            if not line:
                 break
-            data += chunk
-    finally:
-        s.close()
-    # Split headers/body
-    try:
-        header, body = data.split(b"\r\n\r\n",1)
-        body = body.strip()
-        return json.loads(body) if body else None
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                _LAST_SAMPLE[cid] = json.loads(line)
+            except Exception:
+                continue
     except Exception:
-        return None
+        pass
+    finally:
+        _LAST_SAMPLE.pop(cid, None)
+        _STREAMERS.pop(cid, None)
+
+def _ensure_streamer(cid: str):
+    t = _STREAMERS.get(cid)
+    if t is None or not t.is_alive():
+        t = threading.Thread(target=_stream_container, args=(cid,), daemon=True)
+        _STREAMERS[cid] = t
+        t.start()
 
 def collect_docker_metrics() -> List[Dict]:
     base = _docker_get('/containers/json')
     metrics: List[Dict] = []
     if not isinstance(base, list):
         return metrics
-    for c in base[:15]:  # cap to first 15 containers
+    containers = base[:15]  # cap to first 15 containers
+    if not containers:
+        return metrics
+    if STREAM_STATS:
+        # Serve from the background pumps' cached samples; zero blocking I/O
+        # here. Freshly started pumps may not have a sample yet, in which
+        # case the container is skipped this cycle.
+        for c in containers:
+            _ensure_streamer(c.get('Id'))
+        stats = [_LAST_SAMPLE.get(c.get('Id')) for c in containers]
+    else:
+        # stream=false still makes dockerd wait ~1s for a CPU sample window
+        # per call; fetching concurrently lets the daemon sample all
+        # containers in the same window instead of serializing N windows.
+        with ThreadPoolExecutor(max_workers=min(8, len(containers))) as ex:
+            stats = list(ex.map(
+                lambda c: _docker_get(f"/containers/{c.get('Id')}/stats?stream=false"),
+                containers,
+            ))
+    for c, stat in zip(containers, stats):
         cid = c.get('Id')
         name = (c.get('Names') or [''])[0].lstrip('/')
-        stat = _docker_get(f'/containers/{cid}/stats?stream=false')
         if not isinstance(stat, dict):
             continue
+        # CPU% from our own previous sample when we have one (long-lived
+        # streaming mode); otherwise fall back to dockerd's precpu_stats,
+        # which the stream=false sampling wait fills in — one-shot cron/timer
+        # runs would emit NULL forever without it.
         cpu_pct = None
         try:
-            cpu_delta = stat['cpu_stats']['cpu_usage']['total_usage'] - stat['precpu_stats']['cpu_usage']['total_usage']
-            sys_delta = stat['cpu_stats']['system_cpu_usage'] - stat['precpu_stats']['system_cpu_usage']
-            if sys_delta > 0 and cpu_delta >= 0:
-                cpu_pct = (cpu_delta / sys_delta) * len(stat['cpu_stats'].get('cpu_usage', {}).get('percpu_usage', []) or [1]) * 100.0
+            cpu = stat['cpu_stats']
+            total = cpu['cpu_usage']['total_usage']
+            system = cpu.get('system_cpu_usage')
+            ncpus = cpu.get('online_cpus') or len(cpu.get('cpu_usage', {}).get('percpu_usage') or [1])
+            prev = _PREV_CPU.get(cid)
+            if prev is None:
+                pre = stat.get('precpu_stats') or {}
+                pre_total = (pre.get('cpu_usage') or {}).get('total_usage')
+                pre_system = pre.get('system_cpu_usage')
+                # Zero/absent on a fresh streaming sample; skip this cycle then
+                if pre_total is not None and pre_system:
+                    prev = (pre_total, pre_system)
+            if prev is not None and system is not None:
+                cpu_delta = total - prev[0]
+                sys_delta = system - prev[1]
+                if sys_delta > 0 and cpu_delta >= 0:
+                    cpu_pct = (cpu_delta / sys_delta) * ncpus * 100.0
+            if system is not None:
+                _PREV_CPU[cid] = (total, system)
         except Exception:
             pass
         mem_usage = stat.get('memory_stats', {}).get('usage')
@@ -93,14 +207,27 @@ def collect_queue_metrics(cur) -> List[Dict]:
         out.append({'source':'supabase:queue','metric':'queue_count','value':float(count),'labels':{'status':status}})
     return out
 
+_EMPTY_LABELS = '{}'
+_metric_fields = itemgetter('source', 'metric', 'value', 'labels')
+
 def push_metrics(rows: List[Dict]):
     if not rows:
         return
+    # Generator + itemgetter: no intermediate list of tuples and no repeated
+    # dict.get dispatch per row; execute_values consumes iterables directly.
+    rows_iter = (
+        (s, m, v, _json_dumps(labels) if labels else _EMPTY_LABELS)
+        for s, m, v, labels in map(_metric_fields, rows)
+    )
     with psycopg2.connect(DSN) as conn:
         with conn.cursor() as cur:
+            # Default page_size=100 would split large batches into many round
+            # trips; send the whole batch in one statement.
             psycopg2.extras.execute_values(cur,
                 "INSERT INTO runtime_metrics (source, metric, value, labels) VALUES %s",
-                [(r['source'], r['metric'], r['value'], json.dumps(r.get('labels') or {})) for r in rows]
+                rows_iter,
+                template="(%s,%s,%s,%s::jsonb)",
+                page_size=max(len(rows), 1000),
             )
             conn.commit()
 
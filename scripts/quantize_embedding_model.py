@@ -6,7 +6,7 @@ Example:
       --model-path models/bge-small-finetuned \
       --output models/bge-small-finetuned-int8 --dtype int8
 """
-import argparse, os, shutil, sys
+import argparse, json, os, shutil, sys
 
 try:
     import torch
@@ -14,7 +14,54 @@ try:
 except ImportError:
     torch = None
 
-from sentence_transformers import SentenceTransformer
+
+def _resolve_backbone_path(model_path: str) -> str:
+    """Locate the transformer backbone dir from sentence-transformers metadata.
+
+    Reading modules.json instead of instantiating SentenceTransformer avoids
+    materializing the full FP32 backbone just to discover its path; peak RAM
+    then holds only the quantized copy.
+    """
+    modules_file = os.path.join(model_path, 'modules.json')
+    if os.path.exists(modules_file):
+        try:
+            with open(modules_file, encoding='utf-8') as f:
+                modules = json.load(f)
+            for m in modules:
+                if str(m.get('type', '')).endswith('Transformer'):
+                    sub = os.path.join(model_path, m.get('path') or '')
+                    if os.path.exists(os.path.join(sub, 'config.json')):
+                        return sub
+        except Exception:  # noqa: BLE001
+            pass
+    return model_path
+
+
+def _fastcopy(src: str, dst: str):
+    """Copy metadata files without moving bytes where the FS allows it.
+
+    Hardlink is O(1) on the same filesystem; copy_file_range lets the
+    kernel reflink/splice on btrfs/xfs; shutil.copy2 is the portable
+    fallback.
+    """
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        with open(src, 'rb') as s, open(dst, 'wb') as d:
+            remaining = os.fstat(s.fileno()).st_size
+            while remaining > 0:
+                moved = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if not moved:
+                    break
+                remaining -= moved
+        if remaining == 0:
+            return
+    except (AttributeError, OSError):
+        pass
+    shutil.copy2(src, dst)
 
 
 def quantize(model_path: str, output: str, dtype: str):
@@ -24,38 +71,32 @@ def quantize(model_path: str, output: str, dtype: str):
         raise SystemExit(f'Output {output} exists')
     os.makedirs(output, exist_ok=True)
 
-    model = SentenceTransformer(model_path, device='cpu')
-    # We will reload underlying auto_model and apply quantization config by saving adapter notionally.
-    backbone = model._first_module()
-    hf_model = getattr(backbone, 'auto_model', None)
-    if hf_model is None:
-        raise SystemExit('Could not locate underlying HF model for quantization')
     if dtype not in ('int8','int4'):
         raise SystemExit('--dtype must be int8 or int4')
 
-    load_kwargs = {}
+    from transformers import AutoModel, AutoTokenizer, BitsAndBytesConfig
+
+    backbone_path = _resolve_backbone_path(model_path)
     if dtype == 'int8':
-        load_kwargs = dict(load_in_8bit=True, device_map='auto')
+        quant_config = BitsAndBytesConfig(load_in_8bit=True)
     else:
-        load_kwargs = dict(load_in_4bit=True, device_map='auto')
-
-    # Re-load the model with quantization (simple approach)
-    from transformers import AutoModel
-    from transformers import AutoConfig
-    name_or_path = hf_model.name_or_path
-    config = AutoConfig.from_pretrained(name_or_path)
-    q_model = AutoModel.from_pretrained(name_or_path, **load_kwargs, config=config)
+        # NF4 + BF16 compute per bitsandbytes guidance (~2x throughput vs FP16 on Ampere+)
+        quant_config = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_compute_dtype=torch.bfloat16,
+            bnb_4bit_quant_type='nf4',
+        )
+    q_model = AutoModel.from_pretrained(backbone_path, quantization_config=quant_config, device_map='auto')
 
     # Save quantized (weights inside q_model) and reuse tokenizer / sentence-transformers config.
     q_model.save_pretrained(output)
-    tokenizer = getattr(backbone, 'tokenizer', None)
-    if tokenizer:
-        tokenizer.save_pretrained(output)
+    tokenizer = AutoTokenizer.from_pretrained(backbone_path)
+    tokenizer.save_pretrained(output)
     # Copy sentence-transformers specific files
     for fname in ('config.json','modules.json'):  # typical st files
         src = os.path.join(model_path, fname)
         if os.path.exists(src):
-            shutil.copy2(src, os.path.join(output, fname))
+            _fastcopy(src, os.path.join(output, fname))
     print(f'[done] quantized model saved to {output}')
 
 
@@ -48,12 +48,15 @@ Future Extensions (not implemented here):
 """
 from __future__ import annotations
 
+import io
 import os
 import time
 import json
+import select
 import signal
 import logging
 import math
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Sequence, Optional
 
 import requests  # type: ignore
@@ -64,6 +67,20 @@ try:
 except ImportError as e:  # pragma: no cover
     raise SystemExit("psycopg2 is required for queue_embedding_worker.py") from e
 
+try:  # optional; C-extension JSON is 3-6x faster on float-heavy payloads
+    import orjson  # type: ignore
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:  # pragma: no cover
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> str:
+        return json.dumps(obj)
+
 # Configuration ----------------------------------------------------------------
 DSN = os.getenv("DATABASE_URL") or os.getenv("SUPABASE_DB_URL")
 if not DSN:
@@ -76,6 +93,7 @@ POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "5"))
 MAX_CONTENT_CHARS = int(os.getenv("WORKER_MAX_CONTENT_CHARS", "100000"))
 LOG_EVERY_N = int(os.getenv("WORKER_LOG_EVERY_N", "20"))
 MODEL_TIMEOUT_SEC = int(os.getenv("MODEL_TIMEOUT_SEC", "120"))
+MAX_RESPONSE_BYTES = int(os.getenv("MODEL_MAX_RESPONSE_BYTES", str(64 * 1024 * 1024)))
 USE_LISTEN = os.getenv("WORKER_LISTEN", "0") == "1"
 LISTEN_CHANNEL = os.getenv("WORKER_LISTEN_CHANNEL", "code_chunk_ingest")
 EMIT_METRICS = os.getenv("METRICS_EMIT", "1") == "1"  # on by default
@@ -96,13 +114,29 @@ signal.signal(signal.SIGTERM, _handle_sigint)
 
 # Embedding --------------------------------------------------------------------
 
+# Keep-alive session: reuses one TCP socket to the embed endpoint instead of
+# reconnecting per batch.
+_SESSION = requests.Session()
+_SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
+
+
 def embed_texts(texts: Sequence[str]) -> List[List[float]]:
     if not texts:
         return []
-    r = requests.post(EMBED_ENDPOINT, json={"texts": list(texts)}, timeout=MODEL_TIMEOUT_SEC)
-    if r.status_code != 200:
-        raise RuntimeError(f"embed endpoint {EMBED_ENDPOINT} status={r.status_code} body={r.text[:200]}")
-    data = r.json()
+    # Stream the body in 64KB chunks with a hard size cap: responses run to
+    # batch_size x dim float literals and an unbounded read is a memory
+    # hazard if the endpoint misbehaves.
+    with _SESSION.post(EMBED_ENDPOINT, json={"texts": list(texts)}, timeout=MODEL_TIMEOUT_SEC, stream=True) as r:
+        buf = bytearray()
+        for chunk in r.iter_content(64 * 1024):
+            buf += chunk
+            if len(buf) > MAX_RESPONSE_BYTES:
+                raise RuntimeError(f"embed endpoint {EMBED_ENDPOINT} response exceeded {MAX_RESPONSE_BYTES} bytes")
+        if r.status_code != 200:
+            raise RuntimeError(f"embed endpoint {EMBED_ENDPOINT} status={r.status_code} body={bytes(buf[:200])!r}")
+    # Parse from raw bytes; avoids requests' text decode and (with orjson)
+    # the stdlib scanner on a payload of batch_size x dim float literals.
+    data = _json_loads(bytes(buf))
     if "embeddings" not in data:
         raise RuntimeError("embed endpoint missing 'embeddings' field")
     embs = data["embeddings"]
@@ -125,12 +159,121 @@ MARK_PROCESSING_SQL = f"UPDATE {QUEUE_TABLE} SET status='processing', updated_at
 MARK_DONE_SQL = f"UPDATE {QUEUE_TABLE} SET status='done', updated_at=NOW() WHERE id = ANY(%s)"
 MARK_ERROR_SQL = f"UPDATE {QUEUE_TABLE} SET status='error', error_message=%s, updated_at=NOW() WHERE id = ANY(%s)"
 
+# Server-side prepared forms of the per-cycle statements: parse+plan happens
+# once per connection instead of every cycle. Parameter types are inferred by
+# Postgres so the queue id type (bigint vs uuid) does not need hardcoding.
+PREPARE_SQL = (
+    "PREPARE worker_lock AS " + LOCK_SQL.replace('%s', '$1'),
+    "PREPARE worker_mark_processing AS " + MARK_PROCESSING_SQL.replace('%s', '$1'),
+    "PREPARE worker_mark_done AS " + MARK_DONE_SQL.replace('%s', '$1'),
+    "PREPARE worker_mark_error AS "
+    + MARK_ERROR_SQL.replace('error_message=%s', 'error_message=$1').replace('ANY(%s)', 'ANY($2)'),
+)
+
+EXEC_LOCK_SQL = "EXECUTE worker_lock(%s)"
+EXEC_MARK_PROCESSING_SQL = "EXECUTE worker_mark_processing(%s)"
+EXEC_MARK_DONE_SQL = "EXECUTE worker_mark_done(%s)"
+EXEC_MARK_ERROR_SQL = "EXECUTE worker_mark_error(%s, %s)"
+
 # Optional unique index for idempotency: (source, batch_tag)
 ENSURE_UNIQUE_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS doc_embeddings_source_batch_tag_idx ON doc_embeddings (source, batch_tag)"
-INSERT_EMB_SQL = "INSERT INTO doc_embeddings (source, chunk, embedding, batch_tag) VALUES %s ON CONFLICT DO NOTHING"
+
+# Partial index matching the lock query: the scan touches only pending rows
+# in created_at order instead of seq-scanning and sorting the whole queue.
+ENSURE_PENDING_IDX_SQL = (
+    f"CREATE INDEX IF NOT EXISTS queue_pending_idx ON {QUEUE_TABLE} (created_at) WHERE status='pending'"
+)
+
+# COPY text-format escaping for tab/newline/backslash within field values.
+_COPY_ESCAPE = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _vector_literal(vec) -> str:
+    """Render a compact pgvector text literal for an embedding.
+
+    The model emits float32 values, so 7 significant digits lose nothing
+    while cutting the literal to roughly a third of the json.dumps form
+    (full float64 reprs plus ', ' separators).
+    """
+    return '[' + ','.join('%.7g' % x for x in vec) + ']'
+
+
+# Embeddings insert and done-update fused into one statement: a batch costs
+# one COPY plus one round trip instead of two statements.
+INSERT_AND_DONE_SQL = f"""
+WITH ins AS (
+  INSERT INTO doc_embeddings (source, chunk, embedding, batch_tag)
+  SELECT source, chunk, embedding::vector, batch_tag FROM doc_embeddings_stage
+  ON CONFLICT DO NOTHING
+)
+UPDATE {QUEUE_TABLE} SET status='done', updated_at=NOW() WHERE id = ANY(%s)
+"""
+
+
+def _copy_insert_embeddings(cur, records, id_map):
+    """Bulk-load embedding rows via COPY and mark their queue rows done.
+
+    COPY bypasses per-row parse/plan overhead, which matters here because each
+    row carries a multi-KB vector literal. Rows land in a temp staging table
+    first so the final INSERT keeps ON CONFLICT DO NOTHING semantics; the
+    queue status update rides along in the same CTE statement.
+    """
+    cur.execute(
+        "CREATE TEMP TABLE doc_embeddings_stage "
+        "(source TEXT, chunk TEXT, embedding TEXT, batch_tag TEXT) ON COMMIT DROP"
+    )
+    buf = io.StringIO()
+    for row in records:
+        buf.write("\t".join(str(v).translate(_COPY_ESCAPE) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY doc_embeddings_stage (source, chunk, embedding, batch_tag) FROM STDIN",
+        buf,
+    )
+    cur.execute(INSERT_AND_DONE_SQL, (id_map,))
 
 CYCLE = 0
 
+# Long-lived worker connection (separate from the LISTEN connection). Opening
+# a connection per cycle pays a TLS/auth handshake 1-4 times per batch, which
+# dominates when batches are small; instead reuse one backend and reconnect
+# only after an OperationalError.
+_CONN: Optional["psycopg2.extensions.connection"] = None
+
+
+def _get_conn() -> "psycopg2.extensions.connection":
+    global _CONN
+    if _CONN is None or _CONN.closed:
+        _CONN = psycopg2.connect(DSN)
+        _CONN.autocommit = False
+        with _CONN.cursor() as cur:
+            for stmt in PREPARE_SQL:
+                cur.execute(stmt)
+        _CONN.commit()
+    return _CONN
+
+
+def _drop_conn():
+    global _CONN
+    if _CONN is not None:
+        try:
+            _CONN.close()
+        except Exception:  # pragma: no cover
+            pass
+        _CONN = None
+
+
+def _rollback_conn(e: Exception):
+    """Roll back after a failure; drop the connection if it looks dead."""
+    try:
+        if _CONN is not None and not _CONN.closed:
+            _CONN.rollback()
+    except Exception:  # pragma: no cover
+        pass
+    if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        _drop_conn()
+
 
 def _listen_connection() -> Optional["psycopg2.extensions.connection"]:
     """Establish a LISTEN connection if enabled; return None if disabled or fails."""
@@ -148,160 +291,217 @@ def _listen_connection() -> Optional["psycopg2.extensions.connection"]:
         return None
 
 
+def _claim_batch() -> Optional[dict]:
+    """Lock and mark one batch of pending rows; return its context or None.
+
+    Rows whose content exceeds the size guard are marked done immediately so
+    they do not loop forever.
+    """
+    conn = _get_conn()
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(EXEC_LOCK_SQL, (WORKER_BATCH_SIZE,))
+        rows = cur.fetchall()
+        if not rows:
+            conn.commit()
+            return None
+        ids = [r["id"] for r in rows]
+        cur.execute(EXEC_MARK_PROCESSING_SQL, (ids,))
+    conn.commit()  # release locks early
+
+    texts = []
+    sources = []
+    checksums = []
+    id_map = []
+    skipped = []
+    # Rows sharing a checksum (identical content under different paths) get
+    # embedded once; the result fans back out to every row at finalize time.
+    by_ck: dict = {}
+    uniq_texts = []
+    for r in rows:
+        content = r["content"] or ""
+        if len(content) > MAX_CONTENT_CHARS:
+            logger.warning("Row id=%s content too large (%s chars) skipping", r["id"], len(content))
+            skipped.append(r["id"])
+            continue
+        texts.append(content)
+        repo = r.get("repository")
+        source_label = f"{repo}:{r['file_path']}" if repo else r["file_path"]
+        sources.append(source_label)
+        ck = r["checksum"]
+        checksums.append(ck)  # use as batch_tag
+        if ck not in by_ck:
+            by_ck[ck] = len(uniq_texts)
+            uniq_texts.append(content)
+        id_map.append(r["id"])
+
+    if skipped:
+        # Mark skipped rows done to avoid retry loops
+        try:
+            conn = _get_conn()
+            with conn.cursor() as cur:
+                cur.execute(EXEC_MARK_DONE_SQL, (skipped,))
+            conn.commit()
+        except Exception as e:
+            _rollback_conn(e)
+    if not texts:
+        return None
+    return {
+        "texts": texts,
+        "uniq_texts": uniq_texts,
+        "by_ck": by_ck,
+        "sources": sources,
+        "checksums": checksums,
+        "id_map": id_map,
+        "claimed_at": time.time(),
+    }
+
+
+def _mark_error(id_map: List, e: Exception):
+    try:
+        conn = _get_conn()
+        with conn.cursor() as cur:
+            cur.execute(EXEC_MARK_ERROR_SQL, (str(e)[:500], id_map))
+        conn.commit()
+    except Exception as e2:  # pragma: no cover
+        _rollback_conn(e2)
+        logger.error("Secondary failure marking errors: %s", e2)
+
+
+def _finalize_batch(batch: dict, fut) -> None:
+    """Join an in-flight embed call and persist its results.
+
+    All DB work stays on the main thread, so the shared connection is never
+    touched concurrently with the executor's HTTP call.
+    """
+    texts = batch["texts"]
+    id_map = batch["id_map"]
+    embed_start = batch["embed_start"]
+    try:
+        embs = fut.result()
+    except Exception as e:
+        logger.error("Embedding failure on batch size %s: %s", len(texts), e)
+        _mark_error(id_map, e)
+        time.sleep(min(POLL_INTERVAL * 2, 60))
+        return
+    # Fan the deduplicated embeddings back out to every claimed row.
+    by_ck = batch["by_ck"]
+    embeddings = [embs[by_ck[ck]] for ck in batch["checksums"]]
+
+    # Insert embeddings
+    records = [(s, t, _vector_literal(v), c) for s, t, v, c in zip(batch["sources"], texts, embeddings, batch["checksums"])]
+    total_tokens = 0
+    if ESTIMATE_TOKENS:
+        # Fast heuristic: assume ~4 chars per token average for code+text mix
+        total_chars = sum(len(t) for t in texts)
+        total_tokens = max(1, math.ceil(total_chars / 4))
+    try:
+        conn = _get_conn()
+        with conn.cursor() as cur:
+            _copy_insert_embeddings(cur, records, id_map)
+            if EMIT_METRICS:
+                # Emit latency metric (ms per item + total) into runtime_metrics if table exists
+                try:
+                    total_ms = (time.time() - embed_start) * 1000.0
+                    per_item = total_ms / max(1,len(records))
+                    # Bulk insert via execute_values
+                    # Shared label serialized once, not once per metric row.
+                    bs_label = _json_dumps({"batch_size": len(records)})
+                    metric_rows = [
+                        ("worker:embedding","embed_batch_latency_ms", total_ms, _json_dumps({"batch_size": len(records), "tokens": total_tokens})),
+                        ("worker:embedding","embed_item_latency_ms", per_item, bs_label),
+                    ]
+                    if ESTIMATE_TOKENS and total_tokens:
+                        metric_rows.append(("worker:embedding","embed_tokens_per_sec", (total_tokens / (total_ms/1000.0)), bs_label))
+                        metric_rows.append(("worker:embedding","embed_tokens", float(total_tokens), bs_label))
+                    psycopg2.extras.execute_values(cur,
+                        "INSERT INTO runtime_metrics (source, metric, value, labels) VALUES %s",
+                        metric_rows,
+                        template="(%s,%s,%s,%s::jsonb)",
+                        page_size=max(len(metric_rows), 1000),
+                    )
+                except Exception:
+                    pass
+        conn.commit()
+    except Exception as e:
+        logger.error("DB upsert failure: %s", e)
+        _rollback_conn(e)
+        # Partial error handling: mark error for rows not inserted? For simplicity mark all error.
+        _mark_error(id_map, e)
+        time.sleep(min(POLL_INTERVAL * 2, 60))
+        return
+
+    dur = time.time() - batch["claimed_at"]
+    logger.info("Processed %s rows in %.2fs (cycle=%s)", len(records), dur, CYCLE)
+
+
+def _idle_wait(listen_conn):
+    if listen_conn is not None:
+        # Block in the kernel until a notify arrives or the timeout fires:
+        # one select() syscall instead of ~20 poll/sleep wakeups per second.
+        try:
+            listen_conn.poll()
+            if not listen_conn.notifies:
+                select.select([listen_conn], [], [], POLL_INTERVAL)
+                listen_conn.poll()
+            notified = bool(listen_conn.notifies)
+            listen_conn.notifies.clear()
+            if not notified and CYCLE % LOG_EVERY_N == 0:
+                logger.info("Idle (LISTEN) cycle=%s", CYCLE)
+        except Exception as e:  # pragma: no cover
+            logger.warning("LISTEN wait failed (%s); fallback to sleep", e)
+            time.sleep(POLL_INTERVAL)
+    else:
+        if CYCLE % LOG_EVERY_N == 0:
+            logger.info("No work (cycle=%s)", CYCLE)
+        time.sleep(POLL_INTERVAL)
+
+
 def main():  # pragma: no cover - runtime script
     global CYCLE
     logger.info("Queue embedding worker starting (batch_size=%s poll=%.1fs)", WORKER_BATCH_SIZE, POLL_INTERVAL)
-    with psycopg2.connect(DSN) as conn:
-        conn.autocommit = False
+    try:
+        conn = _get_conn()
         with conn.cursor() as cur:
-            # Ensure unique index for idempotent inserts
-            try:
-                cur.execute(ENSURE_UNIQUE_SQL)
-                conn.commit()
-            except Exception as e:  # pragma: no cover
-                conn.rollback()
-                logger.warning("Could not ensure unique index: %s", e)
+            # Ensure unique index for idempotent inserts + partial index for
+            # the pending-row lock scan
+            cur.execute(ENSURE_UNIQUE_SQL)
+            cur.execute(ENSURE_PENDING_IDX_SQL)
+        conn.commit()
+    except Exception as e:  # pragma: no cover
+        _rollback_conn(e)
+        logger.warning("Could not ensure indexes: %s", e)
 
     listen_conn = _listen_connection()
+    # Two-slot pipeline: while batch N's embedding HTTP call runs in the
+    # executor, the main thread already claims batch N+1, so a cycle costs
+    # max(db, embed) instead of db + embed.
+    executor = ThreadPoolExecutor(max_workers=1)
+    inflight = None  # (batch_ctx, embed future)
     while not _shutdown:
         CYCLE += 1
-        start_cycle = time.time()
-        batch_rows = []
+        batch = None
+        claim_failed = False
         try:
-            with psycopg2.connect(DSN) as conn:
-                with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                    cur.execute(LOCK_SQL, (WORKER_BATCH_SIZE,))
-                    rows = cur.fetchall()
-                    if not rows:
-                        conn.commit()
-                        if listen_conn is not None:
-                            # Block waiting for notification (with timeout) to reduce idle CPU
-                            try:
-                                # Wait up to poll interval for notify
-                                listen_conn.poll()
-                                notified = False
-                                start_wait = time.time()
-                                while time.time() - start_wait < POLL_INTERVAL:
-                                    if listen_conn.notifies:
-                                        listen_conn.notifies.clear()
-                                        notified = True
-                                        break
-                                    time.sleep(0.25)
-                                    listen_conn.poll()
-                                if not notified and CYCLE % LOG_EVERY_N == 0:
-                                    logger.info("Idle (LISTEN) cycle=%s", CYCLE)
-                            except Exception as e:  # pragma: no cover
-                                logger.warning("LISTEN wait failed (%s); fallback to sleep", e)
-                                time.sleep(POLL_INTERVAL)
-                        else:
-                            if CYCLE % LOG_EVERY_N == 0:
-                                logger.info("No work (cycle=%s)", CYCLE)
-                            time.sleep(POLL_INTERVAL)
-                        continue
-                    ids = [r["id"] for r in rows]
-                    cur.execute(MARK_PROCESSING_SQL, (ids,))
-                    conn.commit()  # release locks early
-                    batch_rows = rows
+            batch = _claim_batch()
         except Exception as e:
             logger.error("Error locking rows: %s", e)
-            time.sleep(min(POLL_INTERVAL * 2, 30))
-            continue
-
-        texts = []
-        sources = []
-        checksums = []
-        id_map = []
-        for r in batch_rows:
-            content = r["content"] or ""
-            if len(content) > MAX_CONTENT_CHARS:
-                logger.warning("Row id=%s content too large (%s chars) skipping", r["id"], len(content))
-                continue
-            texts.append(content)
-            repo = r.get("repository")
-            source_label = f"{repo}:{r['file_path']}" if repo else r["file_path"]
-            sources.append(source_label)
-            checksums.append(r["checksum"])  # use as batch_tag
-            id_map.append(r["id"])
-
-        if not texts:
-            # Mark skipped rows done to avoid retry loops
-            try:
-                with psycopg2.connect(DSN) as conn:
-                    with conn.cursor() as cur:
-                        if id_map:
-                            cur.execute(MARK_DONE_SQL, (id_map,))
-                            conn.commit()
-            except Exception:
-                pass
-            continue
-
-        embed_start = time.time()
-        try:
-            embeddings = embed_texts(texts)
-        except Exception as e:
-            logger.error("Embedding failure on batch size %s: %s", len(texts), e)
-            # Mark rows error
-            try:
-                with psycopg2.connect(DSN) as conn:
-                    with conn.cursor() as cur:
-                        cur.execute(MARK_ERROR_SQL, (str(e)[:500], id_map))
-                        conn.commit()
-            except Exception as e2:  # pragma: no cover
-                logger.error("Secondary failure marking errors: %s", e2)
-            time.sleep(min(POLL_INTERVAL * 2, 60))
-            continue
-
-        # Insert embeddings
-        records = [(s, t, json.dumps(v), c) for s, t, v, c in zip(sources, texts, embeddings, checksums)]
-        total_tokens = 0
-        if ESTIMATE_TOKENS:
-            # Fast heuristic: assume ~4 chars per token average for code+text mix
-            total_chars = sum(len(t) for t in texts)
-            total_tokens = max(1, math.ceil(total_chars / 4))
-        try:
-            with psycopg2.connect(DSN) as conn:
-                with conn.cursor() as cur:
-                    psycopg2.extras.execute_values(cur, INSERT_EMB_SQL, records)
-                    cur.execute(MARK_DONE_SQL, (id_map,))
-                    if EMIT_METRICS:
-                        # Emit latency metric (ms per item + total) into runtime_metrics if table exists
-                        try:
-                            total_ms = (time.time() - embed_start) * 1000.0
-                            per_item = total_ms / max(1,len(records))
-                            # Insert a no-op placeholder removed (legacy)
-                        except Exception:
-                            pass
-                        try:
-                            # Bulk insert via execute_values
-                            metric_rows = [
-                                ("worker:embedding","embed_batch_latency_ms", total_ms, json.dumps({"batch_size": len(records), "tokens": total_tokens })),
-                                ("worker:embedding","embed_item_latency_ms", per_item, json.dumps({"batch_size": len(records) })),
-                            ]
-                            if ESTIMATE_TOKENS and total_tokens:
-                                metric_rows.append(("worker:embedding","embed_tokens_per_sec", (total_tokens / (total_ms/1000.0)), json.dumps({"batch_size": len(records)})))
-                                metric_rows.append(("worker:embedding","embed_tokens", float(total_tokens), json.dumps({"batch_size": len(records)})))
-                            psycopg2.extras.execute_values(cur,
-                                "INSERT INTO runtime_metrics (source, metric, value, labels) VALUES %s",
-                                metric_rows
-                            )
-                        except Exception:
-                            pass
-                    conn.commit()
-        except Exception as e:
-            logger.error("DB upsert failure: %s", e)
-            # Partial error handling: mark error for rows not inserted? For simplicity mark all error.
-            try:
-                with psycopg2.connect(DSN) as conn:
-                    with conn.cursor() as cur:
-                        cur.execute(MARK_ERROR_SQL, (str(e)[:500], id_map))
-                        conn.commit()
-            except Exception:
-                pass
-            time.sleep(min(POLL_INTERVAL * 2, 60))
-            continue
-
-        dur = time.time() - start_cycle
-        logger.info("Processed %s rows in %.2fs (cycle=%s)", len(records), dur, CYCLE)
+            _rollback_conn(e)
+            claim_failed = True
+        fut = None
+        if batch is not None:
+            batch["embed_start"] = time.time()
+            fut = executor.submit(embed_texts, batch["uniq_texts"])
+        if inflight is not None:
+            _finalize_batch(*inflight)
+        inflight = (batch, fut) if batch is not None else None
+        if inflight is None:
+            if claim_failed:
+                time.sleep(min(POLL_INTERVAL * 2, 30))
+            else:
+                _idle_wait(listen_conn)
+    if inflight is not None:
+        _finalize_batch(*inflight)
+    executor.shutdown(wait=True)
 
     logger.info("Worker exiting after %s cycles", CYCLE)
 
@@ -31,7 +31,8 @@ Exit codes:
 """
 from __future__ import annotations
 
-import argparse, os, glob, sys, hashlib, json, math, time
+import argparse, functools, os, glob, sys, hashlib, json, math, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Sequence
 from datetime import datetime, UTC
@@ -44,52 +45,144 @@ except Exception as e:  # noqa: BLE001
 
 import requests
 
+try:  # optional; C serializer for the per-row metadata JSONB text
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:  # optional; decodes msgpack ~2-3x faster than msgpack's own unpacker
+    import msgspec.msgpack  # type: ignore
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+def _json_dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
 DSN = os.getenv("DATABASE_URL") or os.getenv("SUPABASE_DB_URL")
 EMBED_ENDPOINT = os.getenv("EMBED_ENDPOINT", "http://127.0.0.1:8000/model/embed")
 
 
-def sha256_text(s: str) -> str:
-    import hashlib
+@functools.lru_cache(maxsize=65536)
+def _sha256_text_cached(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+def sha256_text(s: str) -> str:
+    # Boilerplate chunks recur across artifacts; memoize short texts and
+    # hash long ones directly so the cache doesn't pin large strings.
+    if len(s) > 4096:
+        return hashlib.sha256(s.encode("utf-8")).hexdigest()
+    return _sha256_text_cached(s)
+
+
 def now_iso() -> str:
     return datetime.now(UTC).isoformat()
 
 
 def load_msgpack(path: Path) -> Dict[str, Any]:
+    # With msgspec installed its C decoder handles the whole artifact
+    # (decoding to the same dicts, so the flexible text-field fallback for
+    # records from different producers keeps working). Otherwise Unpacker
+    # streams straight off the file object instead of materializing the
+    # bytes before decoding, halving peak memory on large batches.
+    # use_list semantics stay default: downstream checks isinstance(list).
     with path.open('rb') as f:
-        return msgpack.unpackb(f.read(), raw=False)
+        if path.suffix == '.zst':  # zstd-framed artifact from rag_ingest
+            import zstandard  # type: ignore
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                if msgspec is not None:
+                    return msgspec.msgpack.decode(reader.read())
+                return next(msgpack.Unpacker(reader, raw=False, max_buffer_size=2**31))
+        if msgspec is not None:
+            return msgspec.msgpack.decode(f.read())
+        return next(msgpack.Unpacker(f, raw=False, max_buffer_size=2**31))
+
 
+def ensure_columns(cur) -> tuple[bool, bool]:
+    """Add missing columns and return (has_meta, has_batch).
 
-def ensure_columns(cur) -> Dict[str, bool]:
+    The schema can't change mid-run, so callers cache the returned flags
+    instead of re-querying information_schema per file.
+    """
     cur.execute("SELECT column_name FROM information_schema.columns WHERE table_name='doc_embeddings'")
     cols = {r[0] for r in cur.fetchall()}
-    needed_alters = []
     if 'batch_tag' not in cols:
-        needed_alters.append("ALTER TABLE doc_embeddings ADD COLUMN IF NOT EXISTS batch_tag TEXT")
+        cur.execute("ALTER TABLE doc_embeddings ADD COLUMN IF NOT EXISTS batch_tag TEXT")
     if 'metadata' not in cols:
-        needed_alters.append("ALTER TABLE doc_embeddings ADD COLUMN IF NOT EXISTS metadata JSONB")
-    for stmt in needed_alters:
-        cur.execute(stmt)
-    return {'batch_tag': 'batch_tag' in cols or any('batch_tag' in s for s in needed_alters),
-            'metadata': 'metadata' in cols or any('metadata' in s for s in needed_alters)}
+        cur.execute("ALTER TABLE doc_embeddings ADD COLUMN IF NOT EXISTS metadata JSONB")
+    # Both columns exist after the ALTERs above
+    return True, True
+
+
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+
+
+def _embed_one_batch(chunk: Sequence[str]) -> List[List[float]]:
+    r = requests.post(EMBED_ENDPOINT, json={"texts": list(chunk)}, timeout=300)
+    r.raise_for_status()
+    data = r.json()
+    embs = data.get("embeddings")
+    if not isinstance(embs, list) or len(embs) != len(chunk):
+        raise RuntimeError("Embedding endpoint returned unexpected shape")
+    return embs
 
 
 def embed_texts(texts: Sequence[str], batch_size: int, sleep: float = 0.0) -> List[List[float]]:
-    out: List[List[float]] = []
-    for i in range(0, len(texts), batch_size):
-        chunk = texts[i:i+batch_size]
-        r = requests.post(EMBED_ENDPOINT, json={"texts": list(chunk)}, timeout=300)
-        r.raise_for_status()
-        data = r.json()
-        embs = data.get("embeddings")
-        if not isinstance(embs, list) or len(embs) != len(chunk):
-            raise RuntimeError("Embedding endpoint returned unexpected shape")
-        out.extend(embs)
-        if sleep:
-            time.sleep(sleep)
-    return out
+    """Embed texts in batches, overlapping HTTP round-trips when possible.
+
+    Batches fan out across a small thread pool (EMBED_CONCURRENCY) so the
+    endpoint fills its own batch queue instead of idling between serial
+    round-trips. --sleep implies deliberate rate limiting, so that path
+    stays sequential.
+    """
+    chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if sleep or len(chunks) <= 1:
+        out: List[List[float]] = []
+        for chunk in chunks:
+            out.extend(_embed_one_batch(chunk))
+            if sleep:
+                time.sleep(sleep)
+        return out
+    with ThreadPoolExecutor(max_workers=min(EMBED_CONCURRENCY, len(chunks))) as ex:
+        return [emb for embs in ex.map(_embed_one_batch, chunks) for emb in embs]
+
+
+# Text-format COPY escaping: backslash and the row/field separators
+_COPY_ESCAPE = str.maketrans({'\\': '\\\\', '\n': '\\n', '\r': '\\r', '\t': '\\t'})
+
+
+def _vector_literal(vec: Sequence[float]) -> str:
+    return '[' + ','.join('%.7g' % v for v in vec) + ']'
+
+
+def _copy_insert(cur, rows, has_meta: bool, has_batch: bool) -> None:
+    """Bulk-insert rows via COPY FROM STDIN (text format).
+
+    COPY streams the whole batch in one protocol message instead of
+    per-row parameter parsing; pgvector accepts its '[...]' text literal
+    directly. Column list adapts to metadata/batch_tag availability.
+    """
+    from io import StringIO
+    buf = StringIO()
+    for (s, t, e, m, b) in rows:
+        fields = [str(s).translate(_COPY_ESCAPE), str(t).translate(_COPY_ESCAPE), _vector_literal(e)]
+        if has_meta:
+            fields.append(_json_dumps(m).translate(_COPY_ESCAPE))
+        if has_batch:
+            fields.append(str(b).translate(_COPY_ESCAPE))
+        buf.write('\t'.join(fields))
+        buf.write('\n')
+    buf.seek(0)
+    cols = 'source, chunk, embedding'
+    if has_meta:
+        cols += ', metadata'
+    if has_batch:
+        cols += ', batch_tag'
+    cur.copy_expert(f"COPY doc_embeddings ({cols}) FROM STDIN", buf)
 
 
 def fetch_existing_hashes(cur, hashes: List[str]) -> set[str]:
@@ -101,129 +194,147 @@ def fetch_existing_hashes(cur, hashes: List[str]) -> set[str]:
     return {r[0] for r in cur.fetchall()}
 
 
-def replay(paths: List[Path], reembed: bool, dummy_fill: Optional[int], batch_tag_override: Optional[str], embed_batch_size: int, dry_run: bool, skip_existing: bool, sleep: float):
+def _replay_file(conn, path: Path, reembed: bool, dummy_fill: Optional[int], batch_tag_override: Optional[str], embed_batch_size: int, dry_run: bool, skip_existing: bool, sleep: float, has_meta: bool, has_batch: bool) -> tuple[int, int]:
+    """Replay one artifact on the given connection; returns (records, inserted)."""
+    try:
+        payload = load_msgpack(path)
+    except Exception as e:  # noqa: BLE001
+        print(f"[warn] Failed to load {path}: {e}")
+        return 0, 0
+    records = payload.get('records') or payload.get('examples') or []
+    if not isinstance(records, list):
+        print(f"[warn] Unexpected records format in {path}")
+        return 0, 0
+    print(f"[file] {path} records={len(records)}")
+    # Prepare embeddings if needed. texts_all holds each record's
+    # resolved text once, aligned with the other parallel arrays, so
+    # the text-field fallback chain runs a single time per record.
+    texts_all: List[str] = []
+    embeddings: List[Optional[List[float]]] = []
+    sources: List[str] = []
+    metas: List[Dict[str, Any]] = []
+    batch_tags: List[str] = []
+    hashes: List[str] = []
+    for rec in records:
+        text = rec.get('text') or rec.get('instruction') or rec.get('chunk') or rec.get('source_text')
+        if not text:
+            continue
+        texts_all.append(text)
+        emb = rec.get('embedding')
+        embeddings.append(None if (reembed or not emb) else emb)
+        meta = rec.get('metadata') or {}
+        if not isinstance(meta, dict):
+            meta = {}
+        if 'content_hash' in meta:
+            h = meta['content_hash']
+        else:
+            h = sha256_text(text)
+            meta['content_hash'] = h
+        hashes.append(h)
+        metas.append(meta)
+        sources.append(rec.get('source') or payload.get('source') or 'replay')
+        bt = batch_tag_override or rec.get('batch_tag') or payload.get('batch_tag') or 'replay_batch'
+        batch_tags.append(bt)
+    # Deduplicate inside batch: dict.setdefault keeps the first index
+    # per hash in one C-level pass
+    first_idx: Dict[str, int] = {}
+    for i, h in enumerate(hashes):
+        first_idx.setdefault(h, i)
+    keep_indices = sorted(first_idx.values())
+    if len(keep_indices) != len(hashes):
+        print(f"[dedupe] Dropped {len(hashes)-len(keep_indices)} duplicate hashes inside batch")
+    # Optionally remove existing
+    existing_hashes: set[str] = set()
+    if skip_existing:
+        with conn.cursor() as cur2:
+            existing_hashes = fetch_existing_hashes(cur2, [hashes[i] for i in keep_indices])
+        if existing_hashes:
+            print(f"[skip-existing] {len(existing_hashes)} already present")
+    final_indices = [i for i in keep_indices if hashes[i] not in existing_hashes]
+    if not final_indices:
+        print("[info] Nothing new to insert after filtering")
+        return len(records), 0
+    # Generate embeddings for kept rows still missing one
+    reembed_needed_map = [i for i in final_indices if embeddings[i] is None]
+    if reembed_needed_map:
+        try:
+            new_embs = embed_texts([texts_all[i] for i in reembed_needed_map], embed_batch_size, sleep)
+            for idx, emb in zip(reembed_needed_map, new_embs):
+                embeddings[idx] = emb
+        except Exception as e:
+            if dummy_fill is not None:
+                print(f"[warn] Embedding request failed; using dummy fill dim={dummy_fill}: {e}")
+                z = [0.0]*dummy_fill
+                for idx in reembed_needed_map:
+                    embeddings[idx] = z
+            else:
+                raise
+    # Fill any remaining None embeddings with dummy if allowed
+    if any(e is None for e in embeddings):
+        if dummy_fill is None:
+            missing = sum(1 for e in embeddings if e is None)
+            raise SystemExit(f"{missing} embeddings missing and no dummy-fill provided")
+        z = [0.0]*dummy_fill
+        for i,e in enumerate(embeddings):
+            if e is None:
+                embeddings[i] = z
+    rows = []
+    for i in final_indices:
+        rows.append((sources[i], texts_all[i], embeddings[i], metas[i], batch_tags[i]))
+    print(f"[prepare] inserting {len(rows)} rows from {path}")
+    if dry_run:
+        return len(records), 0
+    with conn.cursor() as cur3:
+        # Column availability cached from ensure_columns at startup
+        _copy_insert(cur3, rows, has_meta, has_batch)
+    conn.commit()
+    return len(records), len(rows)
+
+
+_WORKER_CONN = None
+
+
+def _replay_one(task) -> tuple[int, int]:
+    """ProcessPoolExecutor entry point: one cached connection per worker.
+
+    Files are independent (dedupe is per-batch), so each worker process
+    holds its own Postgres connection and commits per file.
+    """
+    global _WORKER_CONN
+    path, *rest = task
+    import psycopg2
+    if _WORKER_CONN is None or _WORKER_CONN.closed:
+        _WORKER_CONN = psycopg2.connect(DSN)
+    return _replay_file(_WORKER_CONN, path, *rest)
+
+
+def replay(paths: List[Path], reembed: bool, dummy_fill: Optional[int], batch_tag_override: Optional[str], embed_batch_size: int, dry_run: bool, skip_existing: bool, sleep: float, parallel_files: int = 1):
     if not DSN:
         raise SystemExit("DATABASE_URL / SUPABASE_DB_URL not set")
     import psycopg2
-    from psycopg2.extras import execute_values, Json
 
     total_files = 0
     total_rows = 0
     inserted = 0
     with psycopg2.connect(DSN) as conn:
         with conn.cursor() as cur:
-            flags = ensure_columns(cur)
+            has_meta, has_batch = ensure_columns(cur)
             conn.commit()
-            print(f"[info] Column availability: {flags}")
-        for path in paths:
-            total_files += 1
-            try:
-                payload = load_msgpack(path)
-            except Exception as e:  # noqa: BLE001
-                print(f"[warn] Failed to load {path}: {e}")
-                continue
-            records = payload.get('records') or payload.get('examples') or []
-            if not isinstance(records, list):
-                print(f"[warn] Unexpected records format in {path}")
-                continue
-            print(f"[file] {path} records={len(records)}")
-            total_rows += len(records)
-            # Prepare embeddings if needed
-            texts: List[str] = []
-            need_embed_indices: List[int] = []
-            embeddings: List[Optional[List[float]]] = []
-            sources: List[str] = []
-            metas: List[Dict[str, Any]] = []
-            batch_tags: List[str] = []
-            hashes: List[str] = []
-            for i, rec in enumerate(records):
-                text = rec.get('text') or rec.get('instruction') or rec.get('chunk') or rec.get('source_text')
-                if not text:
-                    continue
-                emb = rec.get('embedding')
-                if reembed or not emb:
-                    need_embed_indices.append(i)
-                    embeddings.append(None)
-                    texts.append(text)
-                else:
-                    embeddings.append(emb)
-                meta = rec.get('metadata') or {}
-                if not isinstance(meta, dict):
-                    meta = {}
-                if 'content_hash' in meta:
-                    h = meta['content_hash']
-                else:
-                    h = sha256_text(text)
-                    meta['content_hash'] = h
-                hashes.append(h)
-                metas.append(meta)
-                sources.append(rec.get('source') or payload.get('source') or 'replay')
-                bt = batch_tag_override or rec.get('batch_tag') or payload.get('batch_tag') or 'replay_batch'
-                batch_tags.append(bt)
-            # Deduplicate inside batch
-            seen = set()
-            keep_indices = [i for i,h in enumerate(hashes) if not (h in seen or seen.add(h))]
-            if len(keep_indices) != len(hashes):
-                print(f"[dedupe] Dropped {len(hashes)-len(keep_indices)} duplicate hashes inside batch")
-            # Optionally remove existing
-            existing_hashes: set[str] = set()
-            if skip_existing:
-                with psycopg2.connect(DSN) as conn2, conn2.cursor() as cur2:
-                    existing_hashes = fetch_existing_hashes(cur2, [hashes[i] for i in keep_indices])
-                if existing_hashes:
-                    print(f"[skip-existing] {len(existing_hashes)} already present")
-            final_indices = [i for i in keep_indices if hashes[i] not in existing_hashes]
-            if not final_indices:
-                print("[info] Nothing new to insert after filtering")
-                continue
-            # Generate embeddings if needed
-            if need_embed_indices:
-                # Map need_embed_indices to subset of final_indices for which embedding missing
-                reembed_needed_map = [i for i in final_indices if embeddings[i] is None]
-                if reembed_needed_map:
-                    try:
-                        new_embs = embed_texts([records[i].get('text') or records[i].get('instruction') or records[i].get('chunk') for i in reembed_needed_map], embed_batch_size, sleep)
-                        for idx, emb in zip(reembed_needed_map, new_embs):
-                            embeddings[idx] = emb
-                    except Exception as e:
-                        if dummy_fill is not None:
-                            print(f"[warn] Embedding request failed; using dummy fill dim={dummy_fill}: {e}")
-                            z = [0.0]*dummy_fill
-                            for idx in reembed_needed_map:
-                                embeddings[idx] = z
-                        else:
-                            raise
-            # Fill any remaining None embeddings with dummy if allowed
-            if any(e is None for e in embeddings):
-                if dummy_fill is None:
-                    missing = sum(1 for e in embeddings if e is None)
-                    raise SystemExit(f"{missing} embeddings missing and no dummy-fill provided")
-                z = [0.0]*dummy_fill
-                for i,e in enumerate(embeddings):
-                    if e is None:
-                        embeddings[i] = z
-            rows = []
-            for i in final_indices:
-                rows.append((sources[i], records[i].get('text') or records[i].get('instruction') or records[i].get('chunk'), embeddings[i], metas[i], batch_tags[i]))
-            print(f"[prepare] inserting {len(rows)} rows from {path}")
-            if dry_run:
-                continue
-            with psycopg2.connect(DSN) as conn3:
-                with conn3.cursor() as cur3:
-                    # Choose insert statement depending on column availability
-                    cur3.execute("SELECT column_name FROM information_schema.columns WHERE table_name='doc_embeddings'")
-                    colset = {r[0] for r in cur3.fetchall()}
-                    has_meta = 'metadata' in colset
-                    has_batch = 'batch_tag' in colset
-                    from psycopg2.extras import execute_values, Json
-                    if has_meta and has_batch:
-                        execute_values(cur3, "INSERT INTO doc_embeddings (source, chunk, embedding, metadata, batch_tag) VALUES %s", [(s,t,e,Json(m),b) for (s,t,e,m,b) in rows])
-                    elif has_batch and not has_meta:
-                        execute_values(cur3, "INSERT INTO doc_embeddings (source, chunk, embedding, batch_tag) VALUES %s", [(s,t,e,b) for (s,t,e,_m,b) in rows])
-                    else:
-                        execute_values(cur3, "INSERT INTO doc_embeddings (source, chunk, embedding) VALUES %s", [(s,t,e) for (s,t,e,_m,_b) in rows])
-                conn3.commit()
-            inserted += len(rows)
+            print(f"[info] Column availability: metadata={has_meta} batch_tag={has_batch}")
+        args_tail = (reembed, dummy_fill, batch_tag_override, embed_batch_size, dry_run, skip_existing, sleep, has_meta, has_batch)
+        if parallel_files > 1 and len(paths) > 1:
+            tasks = [(path,) + args_tail for path in paths]
+            with ProcessPoolExecutor(max_workers=min(parallel_files, len(paths))) as ex:
+                for n_records, n_inserted in ex.map(_replay_one, tasks):
+                    total_files += 1
+                    total_rows += n_records
+                    inserted += n_inserted
+        else:
+            for path in paths:
+                total_files += 1
+                n_records, n_inserted = _replay_file(conn, path, *args_tail)
+                total_rows += n_records
+                inserted += n_inserted
     print(f"[done] files={total_files} total_records={total_rows} inserted={inserted}")
 
 
@@ -237,6 +348,7 @@ def parse_args(argv=None):
     ap.add_argument('--embed-batch-size', type=int, default=32)
     ap.add_argument('--skip-existing', action='store_true', help='Skip rows whose content_hash already present (needs metadata column)')
     ap.add_argument('--sleep', type=float, default=0.0, help='Sleep seconds between embedding batches')
+    ap.add_argument('--parallel-files', type=int, default=1, help='Replay this many msgpack files concurrently (process pool, one DB connection per worker)')
     ap.add_argument('--dry-run', action='store_true')
     return ap.parse_args(argv)
 
@@ -252,7 +364,7 @@ def main(argv=None):
     if not paths:
         print("Provide --file or --glob", file=sys.stderr)
         return 2
-    replay(paths, args.reembed, args.dummy_fill, args.batch_tag, args.embed_batch_size, args.dry_run, args.skip_existing, args.sleep)
+    replay(paths, args.reembed, args.dummy_fill, args.batch_tag, args.embed_batch_size, args.dry_run, args.skip_existing, args.sleep, args.parallel_files)
     return 0
 
 
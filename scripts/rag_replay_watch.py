@@ -4,30 +4,42 @@
 Uses `rag_replay_msgpack.replay` to insert new chunk records into Postgres.
 
 Strategy:
-  * Poll every --interval seconds (default 15)
+  * Event-driven via watchdog (inotify/FSEvents/ReadDirectoryChangesW) when
+    installed: near-zero CPU while idle, sub-second pickup of new artifacts
+    (files must pass a size-settle check before replay; an idle sweep every
+    --interval seconds backstops backends that drop or elide events)
+  * Falls back to polling every --interval seconds (default 15) when
+    watchdog is unavailable (or for network filesystems without events)
+  * One catch-up glob pass at startup seeds files dropped while not running
   * Track processed files via in-memory set + optional state file (--state-file)
   * Supports --reembed / --dummy-fill consistent with replay script
-  * Globs are re-evaluated each poll (e.g. 'data/msgpack/*.msgpack')
 
 Example:
-  python dev-indexer_1/scripts/rag_replay_watch.py --glob 'data/msgpack/*.msgpack' \
+  python dev-indexer_1/scripts/rag_replay_watch.py --glob 'data/msgpack/*.msgpack*' \
       --interval 10 --dummy-fill 768 --skip-existing
 
 Press Ctrl+C to stop. Safe to restart; previously processed files will be skipped.
 """
 from __future__ import annotations
 
-import argparse, glob, os, sys, time, json
+import argparse, fnmatch, glob, os, queue, re, sys, time, json
 from pathlib import Path
 from typing import List, Set
 
 from rag_replay_msgpack import replay  # type: ignore
 
+try:  # optional; OS file events instead of periodic glob+stat sweeps
+    from watchdog.observers import Observer  # type: ignore
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+except ImportError:  # pragma: no cover
+    Observer = None
+    FileSystemEventHandler = object
+
 
 def parse_args():
     ap = argparse.ArgumentParser(description="Watch directory/glob for new msgpack artifacts and replay them")
-    ap.add_argument('--glob', required=True, help='Glob pattern for msgpack files')
-    ap.add_argument('--interval', type=int, default=15, help='Polling interval seconds')
+    ap.add_argument('--glob', required=True, help="Glob pattern for msgpack files (use '*.msgpack*' to also match zstd-compressed .msgpack.zst artifacts)")
+    ap.add_argument('--interval', type=int, default=15, help='Polling interval seconds (fallback / event drain timeout)')
     ap.add_argument('--reembed', action='store_true', help='Regenerate embeddings even if present')
     ap.add_argument('--dummy-fill', type=int, help='Zero vector dim if embedding missing / fails')
     ap.add_argument('--batch-tag', help='Override batch tag for all rows')
@@ -35,6 +47,7 @@ def parse_args():
     ap.add_argument('--skip-existing', action='store_true')
     ap.add_argument('--sleep', type=float, default=0.0, help='Sleep between embedding micro-batches')
     ap.add_argument('--state-file', help='Persist processed file list to this JSON file for restart safety')
+    ap.add_argument('--poll', action='store_true', help='Force polling even if watchdog is installed (e.g. NFS)')
     ap.add_argument('--dry-run', action='store_true')
     return ap.parse_args()
 
@@ -60,27 +73,152 @@ def save_state(path: str | None, processed: Set[str]):
         print(f"[warn] Failed to save state: {e}")
 
 
+def _replay_new(new_files: List[Path], args, processed: Set[str], presorted: bool = False):
+    if not presorted:
+        new_files.sort(key=lambda p: p.stat().st_mtime)
+    print(f"[watch] Found {len(new_files)} new file(s)")
+    try:
+        replay(new_files, args.reembed, args.dummy_fill, args.batch_tag, args.embed_batch_size, args.dry_run, args.skip_existing, args.sleep)
+    except SystemExit:  # propagate config issues
+        raise
+    except Exception as e:  # noqa: BLE001
+        print(f"[error] Replay failed: {e}")
+    for f in new_files:
+        processed.add(str(f))
+    save_state(args.state_file, processed)
+
+
+def _scan_once(args, processed: Set[str]):
+    base = os.path.dirname(args.glob)
+    name_pat = os.path.basename(args.glob)
+    entries: List[tuple] = []
+    if not glob.has_magic(base):
+        # Single-directory glob: one scandir pass serves names and cached
+        # mtimes together instead of a stat syscall per matched file
+        try:
+            with os.scandir(base or '.') as it:
+                for e in it:
+                    if e.is_file() and fnmatch.fnmatch(e.name, name_pat):
+                        entries.append((e.path, e.stat().st_mtime))
+        except FileNotFoundError:
+            return
+    else:
+        # Cross-directory patterns still need glob + per-file stat
+        for p in glob.glob(args.glob, recursive=True):
+            if os.path.isfile(p):
+                entries.append((p, os.stat(p).st_mtime))
+    new_entries = [(p, m) for p, m in entries if p not in processed]
+    if new_entries:
+        new_entries.sort(key=lambda t: t[1])
+        _replay_new([Path(p) for p, _ in new_entries], args, processed, presorted=True)
+
+
+class _ArtifactHandler(FileSystemEventHandler):
+    """Pushes paths matching the glob onto a queue as files are written.
+
+    on_closed only exists on the inotify backend; FSEvents/ReadDirectoryChangesW
+    report in-place writes as created/modified, so those push too and the
+    consumer settle-checks before replaying.
+    """
+
+    def __init__(self, q: "queue.Queue[str]", pattern: re.Pattern):
+        self._queue = q
+        self._pattern = pattern
+
+    def _push(self, path: str):
+        # Pattern and event path are both absolute-normalized, so relative
+        # and absolute --glob values match the same files
+        if path and self._pattern.match(os.path.abspath(path)):
+            self._queue.put(path)
+
+    def on_closed(self, event):  # writer finished the artifact (inotify only)
+        if not event.is_directory:
+            self._push(event.src_path)
+
+    def on_moved(self, event):  # atomic rename into place
+        if not event.is_directory:
+            self._push(event.dest_path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._push(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._push(event.src_path)
+
+
+def _watch_root(pattern: str) -> str:
+    """Deepest directory prefix of the glob without wildcard characters."""
+    root = pattern
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or '.'
+
+
+def _watch_events(args, processed: Set[str]):
+    q: "queue.Queue[str]" = queue.Queue()
+    handler = _ArtifactHandler(q, re.compile(fnmatch.translate(os.path.abspath(args.glob))))
+    observer = Observer()
+    observer.schedule(handler, _watch_root(args.glob), recursive=True)
+    observer.start()
+    print(f"[watch] Event-driven watching under '{_watch_root(args.glob)}'")
+    try:
+        while True:
+            # Block on the first event, then drain whatever else arrived so
+            # bursts of artifacts replay as one batch
+            batch: List[str] = []
+            try:
+                batch.append(q.get(timeout=args.interval))
+            except queue.Empty:
+                # Idle safety sweep: catches files whose events the backend
+                # never delivered (respects `processed`, so it is cheap)
+                _scan_once(args, processed)
+                continue
+            while True:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            candidates = []
+            seen: Set[str] = set()
+            for raw in batch:
+                p = Path(raw)
+                key = str(p)
+                if key in processed or key in seen or not p.is_file():
+                    continue
+                seen.add(key)
+                candidates.append(p)
+            if not candidates:
+                continue
+            # created/modified events fire mid-write; only replay files whose
+            # size held still over a short settle window. Unsettled files get
+            # more events as the writer continues (or the idle sweep above).
+            sizes = {p: p.stat().st_size for p in candidates}
+            time.sleep(1.0)
+            new_files = [p for p in candidates if p.is_file() and p.stat().st_size == sizes[p]]
+            if new_files:
+                _replay_new(new_files, args, processed)
+    finally:
+        observer.stop()
+        observer.join()
+
+
 def main():  # pragma: no cover
     args = parse_args()
     processed = load_state(args.state_file)
     print(f"[watch] Starting; already have {len(processed)} processed entries")
     try:
-        while True:
-            paths: List[Path] = [Path(p) for p in glob.glob(args.glob, recursive=True)]
-            new_files = [p for p in paths if p.is_file() and str(p) not in processed]
-            if new_files:
-                new_files.sort(key=lambda p: p.stat().st_mtime)
-                print(f"[watch] Found {len(new_files)} new file(s)")
-                try:
-                    replay(new_files, args.reembed, args.dummy_fill, args.batch_tag, args.embed_batch_size, args.dry_run, args.skip_existing, args.sleep)
-                except SystemExit as se:  # propagate config issues
-                    raise
-                except Exception as e:  # noqa: BLE001
-                    print(f"[error] Replay failed: {e}")
-                for f in new_files:
-                    processed.add(str(f))
-                save_state(args.state_file, processed)
-            time.sleep(args.interval)
+        # Catch-up pass: replay anything dropped while the watcher was down
+        _scan_once(args, processed)
+        if Observer is not None and not args.poll:
+            _watch_events(args, processed)
+        else:
+            if Observer is None:
+                print("[watch] watchdog not installed; using polling fallback")
+            while True:
+                time.sleep(args.interval)
+                _scan_once(args, processed)
     except KeyboardInterrupt:
         print("\n[watch] Stopped by user")
         save_state(args.state_file, processed)
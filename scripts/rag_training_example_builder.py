@@ -11,11 +11,44 @@ real retrieval logs + human authored examples for production.
 """
 from __future__ import annotations
 
-import argparse, os, json, random, textwrap, hashlib
+import argparse, array, os, json, random, textwrap, hashlib
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, UTC
 from typing import List, Dict, Any
 
+try:  # optional; C encoders for JSONL/msgpack output
+    import msgspec  # type: ignore
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+try:  # optional; fallback C JSON encoder when msgspec is absent
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+# Per-line codecs (msgspec > orjson > stdlib). Records are encoded one at a
+# time and streamed to disk, so peak memory no longer scales with --total.
+_json_enc = msgspec.json.Encoder() if msgspec is not None else None
+_json_dec = msgspec.json.Decoder() if msgspec is not None else None
+
+
+def _encode_line(record: Dict[str, Any]) -> bytes:
+    if _json_enc is not None:
+        return _json_enc.encode(record) + b'\n'
+    if orjson is not None:
+        return orjson.dumps(record) + b'\n'
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def _decode_line(line: bytes) -> Dict[str, Any]:
+    if _json_dec is not None:
+        return _json_dec.decode(line)
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
 
 @dataclass
 class DocStub:
@@ -38,22 +71,34 @@ DEFAULT_DISTRIBUTION = {
 }
 
 
-def sha256(s: str) -> str:
-    return hashlib.sha256(s.encode()).hexdigest()
+def sha256_parts(*parts: str) -> str:
+    # Feed parts into one hasher instead of concatenating them first; the
+    # prompt+response concat was an O(total length) throwaway allocation
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode('utf-8'))
+    return h.hexdigest()
 
 
-def make_prompt(query: str, docs: List[DocStub]) -> str:
-    ctx_lines = ["[RAG_CONTEXT]"]
-    for d in docs:
-        ctx_lines.append(f"<{d.doc_id} title=\"{d.title}\">\n{d.content}\n</{d.doc_id}>")
-    ctx_lines.append("[/RAG_CONTEXT]")
-    instructions = textwrap.dedent(
-        """[INSTRUCTIONS]
+# Dedented once at import instead of per make_prompt call (the indentation
+# matches the original in-function literal so output stays byte-identical)
+_INSTRUCTIONS = textwrap.dedent(
+    """[INSTRUCTIONS]
         You are a tutoring assistant. Use ONLY facts in documents D* above.
         Cite sources inline as [Dk]. If insufficient info, output NEED_RETRIEVAL_MORE only.
         """.strip()
-    )
-    return f"[USER]\n{query}\n\n" + "\n".join(ctx_lines) + "\n\n" + instructions
+)
+
+
+def make_prompt(query: str, docs: List[DocStub]) -> str:
+    # Collect fragments and join once; repeated '+' concatenation was
+    # reallocating the growing prompt per piece
+    parts = ["[USER]\n", query, "\n\n[RAG_CONTEXT]"]
+    for d in docs:
+        parts.append(f"\n<{d.doc_id} title=\"{d.title}\">\n{d.content}\n</{d.doc_id}>")
+    parts.append("\n[/RAG_CONTEXT]\n\n")
+    parts.append(_INSTRUCTIONS)
+    return "".join(parts)
 
 
 def build_example(rng: random.Random, scenario: str, idx: int) -> Dict[str, Any]:
@@ -127,11 +172,18 @@ def build_example(rng: random.Random, scenario: str, idx: int) -> Dict[str, Any]
         "prompt": prompt,
         "response": response,
         "created_at": datetime.now(UTC).isoformat(),
-        "hash": sha256(prompt + "\n" + response),
+        "hash": sha256_parts(prompt, "\n", response),
     }
     return record
 
 
+def _build_one(task: tuple) -> Dict[str, Any]:
+    # Process-pool worker: each task seeds its own Random so results don't
+    # depend on which worker picks up which chunk
+    scenario, idx, seed = task
+    return build_example(random.Random(seed), scenario, idx)
+
+
 def allocate_counts(total: int, dist: Dict[str, float]) -> Dict[str, int]:
     raw = {k: total * v for k, v in dist.items()}
     counts = {k: int(v) for k, v in raw.items()}
@@ -151,26 +203,67 @@ def main():
     ap.add_argument("--total", type=int, default=120)
     ap.add_argument("--seed", type=int, default=7)
     ap.add_argument("--no-msgpack", action="store_true", help="Skip msgpack artifact")
+    ap.add_argument("--no-shuffle", action="store_true", help="Keep generation order (skips the shuffle pass)")
     args = ap.parse_args()
     os.makedirs(os.path.dirname(args.out), exist_ok=True)
     rng = random.Random(args.seed)
     counts = allocate_counts(args.total, DEFAULT_DISTRIBUTION)
-    records: List[Dict[str, Any]] = []
+    tasks = []
     for scenario in SCENARIOS:
         for i in range(counts[scenario]):
-            records.append(build_example(rng, scenario, i))
-    rng.shuffle(records)
-    with open(args.out, 'w', encoding='utf-8') as f:
-        for r in records:
-            f.write(json.dumps(r, ensure_ascii=False) + '\n')
-    print(f"[jsonl] wrote {len(records)} examples -> {args.out}")
+            tasks.append((scenario, i, args.seed + len(tasks)))
+
+    # First pass: stream each record to a temp file as it is built, keeping
+    # only its byte offset. Peak RSS is 8 bytes per example instead of the
+    # full record; shuffling the offsets then randomizes training order.
+    tmp_path = args.out + '.tmp'
+    offsets = array.array('Q')
+    with open(tmp_path, 'wb', buffering=1 << 20) as tf:
+        def _emit(rec: Dict[str, Any]):
+            offsets.append(tf.tell())
+            tf.write(_encode_line(rec))
+        if len(tasks) >= 2000:
+            # Example assembly (prompt join + sha256) is CPU-bound; fan large
+            # runs across cores. map preserves task order so the shuffle below
+            # sees the same sequence as the serial path.
+            with ProcessPoolExecutor() as ex:
+                for rec in ex.map(_build_one, tasks, chunksize=256):
+                    _emit(rec)
+        else:
+            # Pool startup costs more than the default --total 120 run
+            for t in tasks:
+                _emit(_build_one(t))
+
+    if args.no_shuffle:
+        os.replace(tmp_path, args.out)
+    else:
+        # Second pass: seek to each shuffled offset and copy the line over
+        rng.shuffle(offsets)
+        with open(tmp_path, 'rb') as tf, open(args.out, 'wb', buffering=1 << 20) as out:
+            for off in offsets:
+                tf.seek(off)
+                out.write(tf.readline())
+        os.remove(tmp_path)
+    print(f"[jsonl] wrote {len(offsets)} examples -> {args.out}")
+
     if not args.no_msgpack:
         try:
             import msgpack  # type: ignore
             mp_path = args.out.replace('.jsonl', '.msgpack')
-            payload = {"version": 1, "total": len(records), "examples": records}
-            with open(mp_path, 'wb') as f:
-                f.write(msgpack.packb(payload, use_bin_type=True))
+            packer = msgpack.Packer(use_bin_type=True)
+            # Emit the same {version, total, examples} envelope as before but
+            # via container headers + one pack per record, so the giant
+            # examples list never exists in memory
+            with open(args.out, 'rb') as jf, open(mp_path, 'wb', buffering=1 << 20) as mf:
+                mf.write(packer.pack_map_header(3))
+                mf.write(packer.pack('version'))
+                mf.write(packer.pack(1))
+                mf.write(packer.pack('total'))
+                mf.write(packer.pack(len(offsets)))
+                mf.write(packer.pack('examples'))
+                mf.write(packer.pack_array_header(len(offsets)))
+                for line in jf:
+                    mf.write(packer.pack(_decode_line(line)))
             print(f"[msgpack] {mp_path}")
         except Exception as e:  # noqa: BLE001
             print(f"[msgpack] skip ({e})")
@@ -23,11 +23,13 @@ Key Patterns:
 """
 from __future__ import annotations
 
+import functools
 import os
 import json
 import time
 import hashlib
 import logging
+import threading
 from typing import Any, Optional, Sequence
 
 try:
@@ -35,6 +37,28 @@ try:
 except ImportError:  # graceful degradation
     msgpack = None  # type: ignore
 
+# Packer/Unpacker construction dominates msgpack cost on small payloads;
+# one reusable instance per thread amortizes it (Packer autoresets per pack)
+_tls = threading.local()
+
+def _pack(value: Any) -> bytes:
+    p = getattr(_tls, 'packer', None)
+    if p is None:
+        p = _tls.packer = msgpack.Packer(use_bin_type=True)
+    return p.pack(value)
+
+def _unpack(raw: bytes) -> Any:
+    u = getattr(_tls, 'unpacker', None)
+    if u is None:
+        u = _tls.unpacker = msgpack.Unpacker(raw=False)
+    try:
+        u.feed(raw)
+        return next(u)
+    except Exception:
+        # Drop the instance so a partial feed can't poison later calls
+        _tls.unpacker = None
+        raise
+
 import redis
 
 logger = logging.getLogger(__name__)
@@ -43,20 +67,35 @@ def _bool(v: Optional[str]) -> bool:
     return (v or '').lower() in {'1', 'true', 'yes', 'on'}
 
 def _redis_client() -> redis.Redis:
+    # Explicit pool: bounds FDs under threaded use, keeps sockets warm
+    # (TCP keepalive) and pings idle connections so stale ones don't add
+    # a reconnect round-trip to the first op that hits them.
     ssl = _bool(os.getenv('REDIS_SSL'))
-    return redis.Redis(
+    pool = redis.ConnectionPool(
         host=os.getenv('REDIS_HOST', 'localhost'),
         port=int(os.getenv('REDIS_PORT', '6379')),
         db=int(os.getenv('REDIS_DB', '0')),
         password=os.getenv('REDIS_PASSWORD'),
-        ssl=ssl,
+        connection_class=redis.SSLConnection if ssl else redis.Connection,
+        max_connections=int(os.getenv('REDIS_POOL_MAX', '32')),
+        health_check_interval=30,
+        socket_keepalive=True,
         socket_timeout=5,
     )
+    return redis.Redis(connection_pool=pool)
+
+@functools.lru_cache(maxsize=1)
+def _R() -> redis.Redis:
+    # Lazy singleton: importing this module no longer opens a TCP connection
+    # (or blocks for socket_timeout when Redis is down). lru_cache is enough
+    # for thread safety; redis.Redis pools connections internally.
+    return _redis_client()
 
-R = _redis_client()
 DEFAULT_TTL = int(os.getenv('DEFAULT_TTL_SECONDS', '300'))
 
+@functools.lru_cache(maxsize=1024)
 def _sha1(text: str) -> str:
+    # Memoized: hot loops re-query the same strings (key build + payload)
     return hashlib.sha1(text.encode('utf-8')).hexdigest()  # nosec - cache hash
 
 def cache_key_rag_query(query: str, top_k: int) -> str:
@@ -65,13 +104,13 @@ def cache_key_rag_query(query: str, top_k: int) -> str:
 def cache_set_json(key: str, value: Any, ttl: Optional[int] = None) -> bool:
     try:
         data = json.dumps(value, separators=(',', ':'))
-        return bool(R.set(key, data, ex=ttl or DEFAULT_TTL))
+        return bool(_R().set(key, data, ex=ttl or DEFAULT_TTL))
     except Exception as e:  # pragma: no cover - defensive
         logger.warning(f"cache_set_json failed: {e}")
         return False
 
 def cache_get_json(key: str) -> Any:
-    raw = R.get(key)
+    raw = _R().get(key)
     if not raw:
         return None
     try:
@@ -83,26 +122,27 @@ def cache_set_msgpack(key: str, value: Any, ttl: Optional[int] = None) -> bool:
     if msgpack is None:
         return cache_set_json(key, value, ttl)
     try:
-        return bool(R.set(key, msgpack.packb(value, use_bin_type=True), ex=ttl or DEFAULT_TTL))
+        return bool(_R().set(key, _pack(value), ex=ttl or DEFAULT_TTL))
     except Exception as e:  # pragma: no cover
         logger.warning(f"cache_set_msgpack failed: {e}")
         return False
 
 def cache_get_msgpack(key: str) -> Any:
-    raw = R.get(key)
+    raw = _R().get(key)
     if not raw:
         return None
     if msgpack is None:
         return cache_get_json(key)
     try:
-        return msgpack.unpackb(raw, raw=False)
+        return _unpack(raw)
     except Exception:  # pragma: no cover
         return None
 
 def cache_rag_query_result(query: str, top_k: int, results: Sequence[dict], ttl: Optional[int] = None) -> bool:
-    key = cache_key_rag_query(query, top_k)
+    qh = _sha1(query)
+    key = f"rag:q:{qh}:{top_k}"
     payload = {
-        'q_hash': _sha1(query),
+        'q_hash': qh,
         'top_k': top_k,
         'results': results,
         'cached_at': int(time.time())
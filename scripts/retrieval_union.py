@@ -25,15 +25,26 @@ def pg_vector_param(dim: int) -> str:
     # Format as Postgres vector literal
     return '(' + ','.join('0' for _ in range(dim)) + ')'  # placeholder if not using server-side embedding
 
-def retrieve(user_id: str, query: str, k_events: int, k_summ: int, k_docs: int) -> Dict[str, Any]:
+def retrieve(user_id: str, query: str, k_events: int, k_summ: int, k_docs: int, server_embed: str | None = None) -> Dict[str, Any]:
     import psycopg2, psycopg2.extras
-    qvec = embed_query(query)
-    dim = len(qvec)
-    import numpy as np
-    pq = '(' + ','.join(str(x) for x in qvec) + ')'
+    if server_embed:
+        # Embed inside Postgres (pgml.embed): no HTTP round-trip and no
+        # float->JSON->text conversions; the raw query text is the param
+        q_cte = "SELECT pgml.embed(%s, %s)::vector AS v"
+        head_params: tuple = (server_embed, query)
+    else:
+        qvec = embed_query(query)
+        # Bind the vector once as a parameter; the q CTE shares it across the
+        # three similarity expressions. Interpolating 768 floats into the SQL
+        # text four times made a multi-KB statement Postgres reparsed per call.
+        pq = '[' + ','.join(f'{x:.6g}' for x in qvec) + ']'
+        q_cte = "SELECT %s::vector AS v"
+        head_params = (pq,)
     sql = f"""
-    WITH recent AS (
-      SELECT id, time, content, embedding, 1 - (embedding <=> {pq}::vector) AS sim
+    WITH q AS (
+      {q_cte}
+    ), recent AS (
+      SELECT id, time, content, embedding, 1 - (embedding <=> (SELECT v FROM q)) AS sim
       FROM conversation_events
       WHERE user_id=%s AND embedded
         AND time > now() - interval '7 days'
@@ -46,16 +57,16 @@ def retrieve(user_id: str, query: str, k_events: int, k_summ: int, k_docs: int)
       ORDER BY score DESC
       LIMIT %s
     ), summ AS (
-      SELECT id, time, summary AS content, embedding, 1 - (embedding <=> {pq}::vector) AS score, scope
+      SELECT id, time, summary AS content, embedding, 1 - (embedding <=> (SELECT v FROM q)) AS score, scope
       FROM conversation_summaries
       WHERE user_id=%s AND embedding IS NOT NULL
       ORDER BY score DESC
       LIMIT %s
     ), docs AS (
-      SELECT id, created_at AS time, chunk AS content, embedding, 1 - (embedding <=> {pq}::vector) AS score
+      SELECT id, created_at AS time, chunk AS content, embedding, 1 - (embedding <=> (SELECT v FROM q)) AS score
       FROM doc_embeddings
       WHERE embedding IS NOT NULL
-      ORDER BY embedding <=> {pq}::vector ASC
+      ORDER BY embedding <=> (SELECT v FROM q) ASC
       LIMIT %s
     )
     SELECT 'event' AS kind, id, time, content, score FROM recent_rank
@@ -68,7 +79,7 @@ def retrieve(user_id: str, query: str, k_events: int, k_summ: int, k_docs: int)
     """
     with psycopg2.connect(DSN) as conn:
         with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            cur.execute(sql, (user_id, k_events, user_id, k_summ, k_docs, k_events, k_summ, k_docs))
+            cur.execute(sql, head_params + (user_id, k_events, user_id, k_summ, k_docs, k_events, k_summ, k_docs))
             rows = cur.fetchall()
     return {
         'query': query,
@@ -83,9 +94,10 @@ def main():
     ap.add_argument('--k-events', type=int, default=8)
     ap.add_argument('--k-summaries', type=int, default=4)
     ap.add_argument('--k-docs', type=int, default=8)
+    ap.add_argument('--server-embed', metavar='MODEL', help='Embed the query inside Postgres via pgml.embed(MODEL, query) instead of the HTTP endpoint')
     ap.add_argument('--out')
     args = ap.parse_args()
-    data = retrieve(args.user_id, args.query, args.k_events, args.k_summaries, args.k_docs)
+    data = retrieve(args.user_id, args.query, args.k_events, args.k_summaries, args.k_docs, args.server_embed)
     out = json.dumps(data, indent=2)
     if args.out:
         with open(args.out,'w',encoding='utf-8') as f: f.write(out)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Shared quality-scoring kernel for ingestion chunks.
+
+Both the demo script and production scoring import score_quality() from
+here. With numba installed the piecewise scorer compiles to a parallel
+native loop (cached after the first run); without it the NumPy
+vectorized path handles the same arrays, just without prange/fastmath.
+"""
+
+import numpy as np
+
+try:  # optional; JIT-compiles the scoring loop to native SIMD code
+    from numba import njit, prange  # type: ignore
+except ImportError:  # pragma: no cover
+    njit = None
+
+GOOD_LICENSES = ["MIT", "Apache-2.0", "BSD-3-Clause", "BSD-2-Clause"]
+
+
+def _score_numpy(alphanum, avg_len, size, license_ok):
+    alphanum_score = np.select(
+        [
+            (alphanum >= 0.6) & (alphanum <= 0.8),
+            ((alphanum >= 0.5) & (alphanum < 0.6)) | ((alphanum > 0.8) & (alphanum <= 0.9)),
+            alphanum >= 0.5,
+        ],
+        [1.0, 0.7, 0.3],
+        default=0.0,
+    )
+    length_score = np.select(
+        [
+            (avg_len >= 40) & (avg_len <= 80),
+            ((avg_len >= 30) & (avg_len < 40)) | ((avg_len > 80) & (avg_len <= 100)),
+            ((avg_len >= 20) & (avg_len < 30)) | ((avg_len > 100) & (avg_len <= 120)),
+        ],
+        [1.0, 0.7, 0.4],
+        default=0.1,
+    )
+    size_score = np.select(
+        [
+            (size >= 500) & (size <= 5000),
+            ((size >= 200) & (size < 500)) | ((size > 5000) & (size <= 15000)),
+            ((size >= 100) & (size < 200)) | ((size > 15000) & (size <= 30000)),
+        ],
+        [1.0, 0.7, 0.4],
+        default=0.1,
+    )
+    license_score = np.where(license_ok, 1.0, 0.5)
+    final_score = (alphanum_score + length_score + size_score + license_score) / 4.0
+    return alphanum_score, length_score, size_score, license_score, final_score
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _score_numba(alphanum, avg_len, size, license_ok):  # pragma: no cover
+        n = alphanum.shape[0]
+        alphanum_score = np.empty(n, np.float64)
+        length_score = np.empty(n, np.float64)
+        size_score = np.empty(n, np.float64)
+        license_score = np.empty(n, np.float64)
+        final_score = np.empty(n, np.float64)
+        for i in prange(n):
+            a = alphanum[i]
+            if 0.6 <= a <= 0.8:
+                a_s = 1.0
+            elif (0.5 <= a < 0.6) or (0.8 < a <= 0.9):
+                a_s = 0.7
+            elif a >= 0.5:
+                a_s = 0.3
+            else:
+                a_s = 0.0
+            ln = avg_len[i]
+            if 40 <= ln <= 80:
+                l_s = 1.0
+            elif (30 <= ln < 40) or (80 < ln <= 100):
+                l_s = 0.7
+            elif (20 <= ln < 30) or (100 < ln <= 120):
+                l_s = 0.4
+            else:
+                l_s = 0.1
+            sz = size[i]
+            if 500 <= sz <= 5000:
+                s_s = 1.0
+            elif (200 <= sz < 500) or (5000 < sz <= 15000):
+                s_s = 0.7
+            elif (100 <= sz < 200) or (15000 < sz <= 30000):
+                s_s = 0.4
+            else:
+                s_s = 0.1
+            lic_s = 1.0 if license_ok[i] else 0.5
+            alphanum_score[i] = a_s
+            length_score[i] = l_s
+            size_score[i] = s_s
+            license_score[i] = lic_s
+            final_score[i] = (a_s + l_s + s_s + lic_s) / 4.0
+        return alphanum_score, length_score, size_score, license_score, final_score
+
+
+def score_quality(alphanum, avg_len, size, license_ok):
+    """Vectorized quality scoring over per-chunk feature arrays.
+
+    Each argument is array-like (one element per chunk); license_ok is a
+    boolean array marking chunks carrying an approved license. Returns the
+    four per-factor score arrays plus the averaged final score.
+    """
+    alphanum = np.ascontiguousarray(alphanum, dtype=np.float64)
+    avg_len = np.ascontiguousarray(avg_len, dtype=np.float64)
+    size = np.ascontiguousarray(size, dtype=np.float64)
+    license_ok = np.ascontiguousarray(license_ok, dtype=np.bool_)
+    if njit is not None:
+        return _score_numba(alphanum, avg_len, size, license_ok)
+    return _score_numpy(alphanum, avg_len, size, license_ok)
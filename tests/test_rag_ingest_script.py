@@ -1,7 +1,8 @@
 """Tests for `scripts/rag_ingest.py` (batch RAG ingestion) using mocks.
 
 We avoid real HTTP and DB connections by monkeypatching:
- - requests.post -> returns fake embeddings sized to chunk count
+ - rag_ingest._SESSION.post -> returns fake embeddings sized to chunk count
+   (embed() posts via the module's pooled Session, not requests.post)
  - psycopg2.connect -> captures execute_values arguments
 """
 from __future__ import annotations
@@ -30,6 +31,9 @@ class _FakeCursor:
     def mogrify(self, *args, **kwargs):  # safety stub for psycopg2 interface completeness
         return b""
 
+    def copy_expert(self, sql, file, **kwargs):  # used by the COPY insert fast path
+        self.store.setdefault("copy", []).append((sql, file.read()))
+
     def close(self):
         pass
 
@@ -55,7 +59,7 @@ class _FakeConn:
         self.closed = True
 
 
-def _mock_requests_post(chunks_holder: dict):  # returns callable matching requests.post
+def _mock_session_post(chunks_holder: dict):  # returns callable matching Session.post
     class _Resp:
         def __init__(self, embeddings: List[List[float]]):
             self._embeddings = embeddings
@@ -95,16 +99,18 @@ def test_rag_ingest_process_inserts(monkeypatch, tmp_path):
 
     monkeypatch.setattr(psycopg2, "connect", _fake_connect)
 
-    # Patch requests.post
-    import requests  # type: ignore
-    monkeypatch.setattr(requests, "post", _mock_requests_post(chunks_holder))
-
     # Import script module fresh (so constants defined) and call process
     ingest_mod = importlib.import_module("scripts.rag_ingest")
     # Force reload to ensure clean state if prior tests imported
     ingest_mod = importlib.reload(ingest_mod)
 
-    inserted = ingest_mod.process([str(f)], source="test_src", batch_tag="test_batch")
+    # Patch the pooled session's post; reload recreated _SESSION, so the
+    # patch must come after it
+    monkeypatch.setattr(ingest_mod._SESSION, "post", _mock_session_post(chunks_holder))
+
+    inserted = ingest_mod.process(
+        [str(f)], source="test_src", batch_tag="test_batch", chunk_size=800, overlap=80
+    )
 
     # If EMBED_DUMMY fast path active, requests.post not called; fallback assertion.
     if os.getenv("EMBED_DUMMY") == "1":
@@ -113,6 +119,10 @@ def test_rag_ingest_process_inserts(monkeypatch, tmp_path):
         # Validate chunking produced multiple entries and we inserted same count
         assert inserted == len(chunks_holder.get("last_texts", []))
         assert inserted > 1  # ensures multi-chunk scenario covered
+        # Rows go in via COPY FROM STDIN; one buffer line per inserted row
+        copy_calls = calls_store.get("copy", [])
+        assert copy_calls
+        assert copy_calls[0][1].count("\n") == inserted
 
 
 def test_rag_ingest_empty_file(monkeypatch, tmp_path):
@@ -124,14 +134,16 @@ def test_rag_ingest_empty_file(monkeypatch, tmp_path):
 
     monkeypatch.setattr(psycopg2, "connect", lambda dsn: _FakeConn({}))
 
-    import requests  # type: ignore
+    ingest_mod = importlib.import_module("scripts.rag_ingest")
+    ingest_mod = importlib.reload(ingest_mod)
+
     # If no chunks, embed() never called; guard by raising if it does
     def _fail_post(*args, **kwargs):  # noqa: D401
         raise AssertionError("embed called for empty file")
 
-    monkeypatch.setattr(requests, "post", _fail_post)
+    monkeypatch.setattr(ingest_mod._SESSION, "post", _fail_post)
 
-    ingest_mod = importlib.import_module("scripts.rag_ingest")
-    ingest_mod = importlib.reload(ingest_mod)
-    inserted = ingest_mod.process([str(empty)], source="empty", batch_tag="none")
+    inserted = ingest_mod.process(
+        [str(empty)], source="empty", batch_tag="none", chunk_size=800, overlap=80
+    )
     assert inserted == 0